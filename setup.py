@@ -18,7 +18,8 @@ setup(
     long_description=open("README.md").read(),
     long_description_content_type="text/markdown",
     url="https://github.com/skapezMpier/voicevoyager",
-    py_modules=["voicevoyager"],
+    py_modules=["voicevoyager", "voicevoyager_analysis", "voicevoyager_audio", "voicevoyager_bench", "voicevoyager_cache", "voicevoyager_cli", "voicevoyager_engine", "voicevoyager_export", "voicevoyager_governor", "voicevoyager_playback", "voicevoyager_segments", "voicevoyager_ui", "voicevoyager_waveform", "voicevoyager_whisper"],
+    entry_points={"console_scripts": ["voicevoyager = voicevoyager_cli:main"]},
     install_requires=[
         "pydub",
         "ttkbootstrap",
@@ -29,6 +30,7 @@ setup(
         "reportlab",
         "pygame",
         "cryptography",
+        "numpy",
         "openai-whisper;platform_system=='Windows'",
     ],
     classifiers=[
@@ -6,62 +6,39 @@ import ttkbootstrap as ttkb
 from ttkbootstrap.constants import *
 from ttkbootstrap.tooltip import ToolTip
 import threading
-import queue
-import google.generativeai as genai
-import speech_recognition as sr
-from openai import OpenAI
-import docx
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-import pygame
-import pygame.mixer as mixer
+import multiprocessing
 import json
 import socket
-import subprocess
 from cryptography.fernet import Fernet
 import re
 import warnings
 from pathlib import Path
-from pydub import AudioSegment
-from pydub.effects import normalize
-import math
-import tempfile
 import time
 
-try:
-    import whisper
-except ImportError:
-    whisper = None
+from voicevoyager_audio import LazyAudioSource, load_peaks, start_ffmpeg_probe
+from voicevoyager_playback import BufferedPlayer
+from voicevoyager_ui import UIQueue
+from voicevoyager_cache import CACHE_DIR, ResultCache, DEFAULT_CACHE_MB
+from voicevoyager_waveform import WaveformView
+from voicevoyager_analysis import DEFAULT_ANALYSIS_CACHE_MB, DEFAULT_WINDOW_TOKENS, SegmentIndex, TranscriptAnalyzer
+from voicevoyager_segments import SegmentStore, format_segment
+from voicevoyager_export import EXPORT_FORMATS, export_path, export_segments
+from voicevoyager_governor import configure_governors
+from voicevoyager_engine import (OFFLINE_MODELS, API_CONFIG_FILE, CONFIG_FILE, ENCRYPTION_KEY, TranscriptionEngine, TranscriptionError,
+                                 TranscriptionSettings, backend_concurrency, clean_text, create_audio_cache, create_clients, load_api_keys,
+                                 load_preferences, write_transcription)
+from voicevoyager_whisper import (whisper_available, model_registry, default_worker_count, WhisperProcessPool, WHISPER_MODEL_SIZES, DEFAULT_WHISPER_MODEL,
+                                  DEFAULT_MEMORY_BUDGET_MB)
 
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
 
-CONFIG_FILE = "voicevoyager_config.json"
-
-def set_ffmpeg_path():
-    try:
-        subprocess.run(["ffmpeg", "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        print("FFmpeg found in system PATH.")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        if os.name == 'nt':
-            ffmpeg_path = os.path.join(base_path, 'ffmpeg', 'win', 'ffmpeg.exe')
-        else:
-            ffmpeg_path = os.path.join(base_path, 'ffmpeg', 'mac' if os.uname().sysname == 'Darwin' else 'linux', 'ffmpeg')
-            os.chmod(ffmpeg_path, 0o755)
-        if not os.path.exists(ffmpeg_path):
-            raise FileNotFoundError(f"FFmpeg not found at {ffmpeg_path}. Ensure it is bundled or installed.")
-        AudioSegment.ffmpeg = ffmpeg_path
-        print(f"Using bundled FFmpeg at {ffmpeg_path}")
-
-set_ffmpeg_path()
-
-os.environ["SDL_AUDIODRIVER"] = "directsound"
-pygame.init()
-mixer.init(buffer=32768, frequency=44100, channels=1)
+# pygame's mixer is started by the player on first playback
+if os.name == "nt":
+    os.environ.setdefault("SDL_AUDIODRIVER", "directsound")
 
 class VoiceVoyager:
     def __init__(self, root):
+        start_ffmpeg_probe()
         self.root = root
         self.root.title("skapezMpier VoiceVoyager")
         self.root.geometry("1000x860")
@@ -75,10 +52,9 @@ class VoiceVoyager:
 
         self.center_window(self.root, 1000, 860)
 
-        self.key = b'D2RU1VRyFjEQU24RSmfz8bQELCeaFfboNQUKxXKz6io='
-        self.cipher = Fernet(self.key)
+        self.cipher = Fernet(ENCRYPTION_KEY)
 
-        self.api_config_file = "api_config.json"
+        self.api_config_file = API_CONFIG_FILE
         self.gemini_api_key = tk.StringVar(value="")
         self.openai_api_key = tk.StringVar(value="")
         self.load_api_keys()
@@ -114,21 +90,23 @@ class VoiceVoyager:
         self.notebook.add(self.api_tab, text="API")
 
         self.file_path = None
-        self.audio = None
+        self.audio_source = None
         self.audio_duration = 0
-        self.full_transcription = ""
+        self.segments = SegmentStore()
+        self.segment_index = SegmentIndex(self.segments)
         self.transcription_thread = None
+        self.whisper_pool = None
         self.is_playing = False
         self.is_transcribing = False
         self.is_processing = False
-        self.sound_obj = None
-        self.temp_file = None
+        self.player = None
         self.current_position = 0
+        self.updating_seek = False
         self.start_time_var = tk.DoubleVar(value=0)
         self.end_time_var = tk.DoubleVar(value=0)
         self.selected_duration_var = tk.StringVar(value="Selected Duration: 0s")
         self.current_position_var = tk.StringVar(value="Current: 0s")
-        self.playback_queue = queue.Queue()
+        self.partial_shown = False
 
         self.setup_transcript_tab()
         self.setup_analysis_tab()
@@ -148,6 +126,10 @@ class VoiceVoyager:
         self.spinner_states = ["|", "/", "-", "\\"]
         self.spinner_index = 0
 
+        # Worker threads post widget updates here instead of touching Tk themselves
+        self.ui = UIQueue(root, self.status_var, self.progress)
+        self.ui.start()
+
         self.load_preferences()
         if not self.hide_intro:
             self.show_intro_modal()
@@ -180,6 +162,16 @@ class VoiceVoyager:
         ttkb.Label(dialog, text=message, wraplength=350).pack(pady=10)
         ttkb.Button(dialog, text="OK", bootstyle="primary", command=dialog.destroy).pack(pady=10)
         
+    def show_dialog(self, title, message, width=400):
+        dialog = tk.Toplevel(self.root)
+        self.set_window_icon(dialog)
+        dialog.title(title)
+        self.center_window(dialog, width, 150 + 20 * message.count("\n"))
+        dialog.transient(self.root)
+        dialog.grab_set()
+        ttkb.Label(dialog, text=message).pack(pady=10)
+        ttkb.Button(dialog, text="OK", bootstyle="primary", command=dialog.destroy).pack(pady=10)
+
     def on_dialog_close(self, dialog):
         self.is_processing = False
         self.update_playback_buttons()
@@ -193,16 +185,9 @@ class VoiceVoyager:
         window.geometry(f"{width}x{height}+{x}+{y}")
 
     def load_api_keys(self):
-        if os.path.exists(self.api_config_file):
-            with open(self.api_config_file, "rb") as f:
-                encrypted_data = f.read()
-            try:
-                decrypted_data = self.cipher.decrypt(encrypted_data).decode()
-                config = json.loads(decrypted_data)
-                self.gemini_api_key.set(config.get("gemini_api_key", ""))
-                self.openai_api_key.set(config.get("openai_api_key", ""))
-            except Exception:
-                pass
+        config = load_api_keys(self.api_config_file)
+        self.gemini_api_key.set(config.get("gemini_api_key", ""))
+        self.openai_api_key.set(config.get("openai_api_key", ""))
 
     def save_api_keys(self):
         config = {"gemini_api_key": self.gemini_api_key.get(), "openai_api_key": self.openai_api_key.get()}
@@ -213,26 +198,34 @@ class VoiceVoyager:
         messagebox.showinfo("API Keys", "API keys saved securely!")
 
     def configure_apis(self):
-        gemini_key = self.gemini_api_key.get() or "YOUR_GEMINI_API_KEY"
-        openai_key = self.openai_api_key.get() or "YOUR_OPENAI_API_KEY"
-        genai.configure(api_key=gemini_key)
-        self.gemini_model = genai.GenerativeModel("gemini-1.5-flash")
-        self.openai_client = OpenAI(api_key=openai_key)
+        self.gemini_model, self.openai_client = create_clients(self.gemini_api_key.get(), self.openai_api_key.get())
 
     def load_preferences(self):
-        self.hide_intro = False
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, "r") as f:
-                try:
-                    config = json.load(f)
-                    self.hide_intro = config.get("hide_intro", False)
-                except json.JSONDecodeError:
-                    pass
-
-    def save_preferences(self, hide_intro):
-        config = {"hide_intro": hide_intro}
+        self.preferences = load_preferences()
+        self.hide_intro = self.preferences.get("hide_intro", False)
+        configure_governors(self.preferences.get("rate_limits"))
+        self.transcription_cache = None
+        if self.preferences.get("transcription_cache", True):
+            try:
+                self.transcription_cache = ResultCache(max_mb=self.preferences.get("transcription_cache_mb", DEFAULT_CACHE_MB), table="transcriptions")
+            except Exception as e:
+                print(f"Transcription cache disabled: {e}")
+        self.audio_cache = create_audio_cache(self.preferences)
+        self.analysis_cache = None
+        if self.preferences.get("analysis_cache", True):
+            try:
+                self.analysis_cache = ResultCache(max_mb=self.preferences.get("analysis_cache_mb", DEFAULT_ANALYSIS_CACHE_MB), table="analysis")
+            except Exception as e:
+                print(f"Analysis cache disabled: {e}")
+        model_registry.set_memory_budget(self.preferences.get("whisper_memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB))
+        self.whisper_size_var.set(self.preferences.get("whisper_model", DEFAULT_WHISPER_MODEL))
+
+    def save_preferences(self, hide_intro=None, **settings):
+        if hide_intro is not None:
+            self.preferences["hide_intro"] = hide_intro
+        self.preferences.update(settings)
         with open(CONFIG_FILE, "w") as f:
-            json.dump(config, f)
+            json.dump(self.preferences, f)
 
     def setup_transcript_tab(self):
         self.file_frame = ttkb.LabelFrame(self.transcript_tab, text="Audio Input", padding=10)
@@ -254,12 +247,23 @@ class VoiceVoyager:
 
         self.model_var = tk.StringVar(value="Gemini")
         model_options = ["Gemini", "Google Speech", "Whisper", "PocketSphinx (Offline)"]
-        if whisper:
+        if whisper_available():
             model_options.append("Whisper Local (Offline)")
         self.model_menu = ttkb.Combobox(self.settings_frame, textvariable=self.model_var, values=model_options, state="readonly", bootstyle="info")
         self.model_menu.pack(side=LEFT, padx=5)
+        self.model_menu.bind("<<ComboboxSelected>>", self.on_model_selected)
         ToolTip(self.model_menu, text="Select the transcription model")
 
+        self.whisper_size_var = tk.StringVar(value=DEFAULT_WHISPER_MODEL)
+        self.whisper_size_menu = ttkb.Combobox(self.settings_frame, textvariable=self.whisper_size_var, values=WHISPER_MODEL_SIZES, state="readonly", width=8, bootstyle="info")
+        self.whisper_size_menu.bind("<<ComboboxSelected>>", self.on_whisper_size_selected)
+        ToolTip(self.whisper_size_menu, text="Select the Whisper Local model size (larger is slower but more accurate)")
+
+        self.single_pass_var = tk.BooleanVar(value=False)
+        self.single_pass_check = ttkb.Checkbutton(self.settings_frame, text="Single Pass", variable=self.single_pass_var, bootstyle="info",
+                                                 command=self.preload_whisper_model)
+        ToolTip(self.single_pass_check, text="Transcribe the whole range in one Whisper call using its own timestamps instead of fixed chunks")
+
         self.language_var = tk.StringVar(value="en-US")
         self.languages = ["en-US", "es-ES", "fr-FR", "de-DE", "it-IT", "ja-JP", "zh-CN", "hi-IN", "ar-SA", "pt-BR", "ru-RU", "ko-KR"]
         self.language_menu = ttkb.Combobox(self.settings_frame, textvariable=self.language_var, values=self.languages, state="readonly", bootstyle="info")
@@ -277,6 +281,11 @@ class VoiceVoyager:
         self.normalize_check.pack(side=LEFT, padx=5)
         ToolTip(self.normalize_check, text="Normalize audio volume for better transcription accuracy")
 
+        self.vad_var = tk.BooleanVar(value=False)
+        self.vad_check = ttkb.Checkbutton(self.settings_frame, text="Skip Silence", variable=self.vad_var, bootstyle="info")
+        self.vad_check.pack(side=LEFT, padx=5)
+        ToolTip(self.vad_check, text="Skip long silences and cut chunks at pauses (chunk size becomes the maximum chunk length)")
+
         self.control_frame = ttkb.Frame(self.transcript_tab)
         self.control_frame.pack(fill=X, pady=10)
 
@@ -309,12 +318,18 @@ class VoiceVoyager:
         self.progress = ttkb.Progressbar(self.control_frame, mode="determinate", bootstyle="info", maximum=100)
         self.progress.pack(side=LEFT, fill=X, expand=True, padx=5)
 
+        self.waveform = WaveformView(self.transcript_tab, on_select=self.on_waveform_select, on_seek=self.seek_scale.set)
+        self.waveform.pack(fill=X, padx=5)
+        ToolTip(self.waveform, text="Drag to select the range to transcribe, click to seek, scroll to zoom")
+        self.update_waveform_colors()
+
         self.output_frame = ttkb.LabelFrame(self.transcript_tab, text="Transcription", padding=10)
         self.output_frame.pack(fill=BOTH, expand=True, pady=5)
 
         self.output_text = ttkb.ScrolledText(self.output_frame, height=15, wrap=tk.WORD, font=("Helvetica", 10))
         self.output_text.pack(fill=BOTH, expand=True)
         self.output_text.tag_config("error", foreground="red")
+        self.output_text.tag_config("partial", foreground="gray")
 
         ttkb.Label(self.transcript_tab, text="Theme:").pack(side=LEFT, padx=5)
         self.theme_combo = ttkb.Combobox(self.transcript_tab, textvariable=self.theme_var, values=["flatly", "darkly"], state="readonly", bootstyle="info")
@@ -350,9 +365,18 @@ class VoiceVoyager:
         self.sentiment_button.pack(side=LEFT, padx=5)
         ToolTip(self.sentiment_button, text="Analyze the sentiment and tone of the transcription")
 
+        self.analyze_all_button = ttkb.Button(self.analysis_frame, text="Analyze All", bootstyle="info-outline", command=self.analyze_all)
+        self.analyze_all_button.pack(side=LEFT, padx=5)
+        ToolTip(self.analyze_all_button, text="Keywords, action items, sentiment and events in a single request")
+
         self.export_button = ttkb.Button(self.analysis_frame, text="Export", bootstyle="info-outline", command=self.export_transcription)
         self.export_button.pack(side=LEFT, padx=5)
-        ToolTip(self.export_button, text="Export the transcription as PDF or DOCX")
+        ToolTip(self.export_button, text="Export the transcription as PDF, DOCX, SRT, WebVTT or JSON Lines")
+
+        self.analysis_cache_var = tk.BooleanVar(value=True)
+        self.analysis_cache_check = ttkb.Checkbutton(self.analysis_frame, text="Reuse Results", variable=self.analysis_cache_var, bootstyle="info")
+        self.analysis_cache_check.pack(side=LEFT, padx=5)
+        ToolTip(self.analysis_cache_check, text="Answer repeated analyses of the same transcription from the cache; uncheck to ask Gemini again")
 
         self.analysis_output = ttkb.ScrolledText(self.analysis_tab, height=15, wrap=tk.WORD, font=("Helvetica", 10))
         self.analysis_output.pack(fill=BOTH, expand=True, pady=5)
@@ -372,10 +396,42 @@ class VoiceVoyager:
         self.save_api_button.grid(row=2, column=1, padx=5, pady=10, sticky="e")
         ToolTip(self.save_api_button, text="Save the API keys securely")
 
+    def on_model_selected(self, event=None):
+        if self.model_var.get() == "Whisper Local (Offline)":
+            self.whisper_size_menu.pack(side=LEFT, padx=5, after=self.model_menu)
+            self.single_pass_check.pack(side=LEFT, padx=5, after=self.whisper_size_menu)
+            self.preload_whisper_model()
+        else:
+            self.whisper_size_menu.pack_forget()
+            self.single_pass_check.pack_forget()
+
+    def on_whisper_size_selected(self, event=None):
+        self.save_preferences(whisper_model=self.whisper_size_var.get())
+        self.preload_whisper_model()
+
+    def preload_whisper_model(self):
+        """Load the model in this process ahead of a run that will use it here rather than in worker processes"""
+        size = self.whisper_size_var.get()
+        if not whisper_available() or model_registry.is_loaded(size) or self.whisper_worker_count(size, self.single_pass_var.get()) > 1:
+            return
+        self.status_var.set(f"Loading Whisper '{size}' model...")
+
+        def on_loaded(name, error):
+            if error:
+                self.ui.status(f"Failed to load Whisper '{name}' model: {error}")
+            elif not self.is_transcribing:
+                self.ui.status(f"Whisper '{name}' model ready")
+        model_registry.preload(size, callback=on_loaded)
+
     def switch_theme(self, event):
         self.style.theme_use(self.theme_var.get())
         self.status_bar.configure(bootstyle="inverse-success" if self.theme_var.get() == "flatly" else "inverse-dark")
         self.update_text_colors()
+        self.update_waveform_colors()
+
+    def update_waveform_colors(self):
+        colors = self.style.colors
+        self.waveform.set_colors(background=colors.inputbg, wave=colors.primary, selection=colors.active, cursor=colors.danger)
 
     def update_text_colors(self):
         default_color = "white" if self.theme_var.get() == "darkly" else "black"
@@ -400,6 +456,7 @@ class VoiceVoyager:
             "   - Language: Select the audio language.\n"
             "   - Chunk: Set how long each transcription segment is (5-300s).\n"
             "   - Normalize: Adjust volume for better accuracy.\n"
+            "   - Skip Silence: Drop long silences and cut chunks at pauses.\n"
             "   - Play/Stop: Control audio playback.\n"
             "   - Seek: Move to a specific part of the audio.\n"
             "   - Transcribe: Start transcription.\n\n"
@@ -410,7 +467,8 @@ class VoiceVoyager:
             "   - Tag Events: Mark non-speech sounds (e.g., laughter).\n"
             "   - Ask Question: Query the transcription.\n"
             "   - Sentiment Analysis: Analyze tone with emojis.\n"
-            "   - Export: Save as PDF or DOCX.\n\n"
+            "   - Analyze All: Keywords, actions, sentiment and events in one request.\n"
+            "   - Export: Save as PDF, DOCX, SRT subtitles, WebVTT or JSON Lines, several at once.\n\n"
             "3. API Tab:\n"
             "   - Enter and save encrypted API keys for Gemini and OpenAI.\n\n"
             "Shortcuts:\n"
@@ -526,7 +584,7 @@ class VoiceVoyager:
             "- Transcribe audio using online models (Gemini, Google Speech, Whisper) or offline models (PocketSphinx, Whisper Local).\n"
             "- Analyze transcriptions for keywords, action items, sentiment, and more.\n"
             "- Interactive audio playback with play and stop controls.\n"
-            "- Export transcriptions as PDF or DOCX files.\n\n"
+            "- Export transcriptions as PDF, DOCX, SRT, WebVTT or JSON Lines files.\n\n"
             "📋 Requirements:\n"
             "- Internet connection for online transcription models (Gemini, Google Speech, Whisper).\n"
             "- FFmpeg installed (via system PATH or bundled with the app).\n"
@@ -585,50 +643,65 @@ class VoiceVoyager:
         self.stop_audio()
         self.file_path = filedialog.askopenfilename(filetypes=[("Audio Files", "*.mp3 *.wav *.aiff *.flac"), ("All Files", "*.*")])
         if self.file_path:
+            try:
+                start_ffmpeg_probe().result()
+            except FileNotFoundError as e:
+                messagebox.showerror("FFmpeg Missing", str(e))
+                return
             self.file_path_var.set(self.file_path)
             self.transcribe_button.config(state="normal")
             self.play_button.config(state="normal" if not self.is_transcribing else "disabled")
             self.output_text.delete(1.0, tk.END)
             self.output_text.insert(tk.END, f"Selected file: {self.file_path}\n")
             self.status_var.set("File selected")
-            self.audio = AudioSegment.from_file(self.file_path)
-            self.audio_duration = len(self.audio) / 1000
+            self.audio_source = LazyAudioSource(self.file_path)
+            self.player = None  # created on first Play, so a mixer that cannot start only affects playback
+            self.waveform.set_peaks(None)
+            threading.Thread(target=self.load_waveform, args=(self.audio_source,), daemon=True).start()
+            self.audio_duration = self.audio_source.duration
             self.duration_label.config(text=f"Duration: {self.audio_duration:.1f} seconds")
             self.seek_scale.config(to=self.audio_duration)
             self.end_time_var.set(self.audio_duration)
             default_chunk = max(5, min(300, int(self.audio_duration / 10)))
             self.chunk_var.set(default_chunk)
             self.update_selected_duration()
-            self.full_transcription = ""
+            self.reset_transcript()
             if self.model_var.get() == "Gemini" and self.audio_duration > 900:
                 self.show_custom_warning("Gemini Limit", "Audio exceeds 15 minutes. Adjust chunk size or switch models.")
             self.update_playback_buttons()
 
+    def load_waveform(self, source):
+        """Build (or read back) the waveform peaks off the UI thread"""
+        try:
+            peaks = load_peaks(source, os.path.join(CACHE_DIR, "peaks"))
+        except Exception as e:
+            print(f"Could not draw waveform: {e}")
+            return
+        def show():
+            if self.audio_source is source:
+                self.waveform.set_peaks(peaks)
+                self.update_selected_duration()
+        self.ui.call(show)
+
+    def on_waveform_select(self, start, end):
+        self.start_time_var.set(round(start, 1))
+        self.end_time_var.set(round(end, 1))
+        self.update_selected_duration()
+
     def play_audio(self):
         if self.is_transcribing or self.is_processing:
             self.show_custom_warning("Processing in Progress", "Cannot play audio while transcription or analysis is processing.")
             return
-        if self.audio and not self.is_playing:
+        if self.audio_source and not self.is_playing:
+            position = self.current_position
             self.stop_audio()  # Ensure previous playback is stopped
             try:
-                # Standardize audio format for compatibility
-                sample_rate = 44100
-                channels = 1  # Mono for simplicity
-                self.audio = self.audio.set_frame_rate(sample_rate).set_channels(channels)
-
-                # Create and export temp file
-                self.temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False).name
-                self.audio.export(self.temp_file, format="wav", parameters=["-ar", str(sample_rate), "-ac", str(channels)])
-
-                # Verify temp file
-                if not os.path.exists(self.temp_file):
-                    raise Exception(f"Temp file {self.temp_file} not created")
-
-                # Use Sound object for playback
-                self.sound_obj = mixer.Sound(self.temp_file)
-                self.sound_obj.play()
+                if self.player is None:
+                    self.player = BufferedPlayer(self.audio_source)
+                self.player.play(position)
                 self.is_playing = True
                 self.update_playback_buttons()
+                self.root.after(50, self.monitor_playback)
             except Exception as e:
                 self.output_text.insert(tk.END, f"Error playing audio: {e}\n", "error")
                 self.status_var.set(f"Error: {e}")
@@ -636,65 +709,74 @@ class VoiceVoyager:
     def stop_audio(self):
         self.is_playing = False
         self.current_position = 0
-        if self.sound_obj:
-            self.sound_obj.stop()
-            self.sound_obj = None
-        if self.temp_file and os.path.exists(self.temp_file):
-            try:
-                os.unlink(self.temp_file)
-            except Exception as e:
-                print(f"Error deleting temp file: {e}")
-            self.temp_file = None
-        self.seek_scale.set(0)
+        if self.player:
+            self.player.stop()
+        self.set_seek_position(0)
+        self.waveform.set_cursor(None)
         self.current_position_var.set("Current: 0s")
         self.status_var.set("Audio stopped")
         self.update_playback_buttons()
 
     def seek_audio(self, value):
+        if self.updating_seek:
+            return
         self.current_position = float(value)
         self.current_position_var.set(f"Current: {self.current_position:.1f}s")
         self.start_time_var.set(self.current_position)
         self.update_selected_duration()
-        if self.is_playing and self.sound_obj:
-            self.sound_obj.stop()
-            self.sound_obj.play(start=self.current_position)
-            self.root.after(100, self.monitor_playback)
+        if self.is_playing and abs(self.current_position - self.player.position()) > 0.5:
+            self.player.play(self.current_position)
+
+    def set_seek_position(self, position):
+        """Move the seek bar without treating it as a user seek"""
+        self.updating_seek = True
+        try:
+            self.seek_scale.set(position)
+        finally:
+            self.updating_seek = False
+        self.current_position_var.set(f"Current: {position:.1f}s")
 
     def monitor_playback(self):
-        if self.is_playing and self.sound_obj:
-            pos = self.current_position + (pygame.mixer.get_pos() / 1000.0)
-            if pos >= self.audio_duration:
+        if self.is_playing and self.player:
+            self.player.pump()
+            if self.player.finished:
                 self.stop_audio()
-            else:
-                self.seek_scale.set(pos)
-                self.current_position_var.set(f"Current: {pos:.1f}s")
-                self.root.after(100, self.monitor_playback)
+                return
+            self.current_position = self.player.position()
+            self.set_seek_position(self.current_position)
+            self.waveform.set_cursor(self.current_position)
+            self.root.after(50, self.monitor_playback)
 
     def update_playback_buttons(self):
         disable_all = self.is_transcribing or self.is_processing
-        self.play_button.config(state="normal" if self.audio and not self.is_playing and not disable_all else "disabled")
+        self.play_button.config(state="normal" if self.audio_source and not self.is_playing and not disable_all else "disabled")
         self.stop_button.config(state="normal" if self.is_playing and not disable_all else "disabled")
         self.transcribe_button.config(state="normal" if self.file_path and not disable_all else "disabled")
         self.clear_button.config(state="normal" if not disable_all else "disabled")
-        self.translate_button.config(state="normal" if self.full_transcription and not disable_all else "disabled")
-        self.keyword_button.config(state="normal" if self.full_transcription and not disable_all else "disabled")
-        self.action_button.config(state="normal" if self.full_transcription and not disable_all else "disabled")
-        self.event_button.config(state="normal" if self.full_transcription and not disable_all else "disabled")
-        self.qa_button.config(state="normal" if self.full_transcription and not disable_all else "disabled")
-        self.sentiment_button.config(state="normal" if self.full_transcription and not disable_all else "disabled")
-        self.export_button.config(state="normal" if self.full_transcription and not disable_all else "disabled")
+        self.translate_button.config(state="normal" if self.segments and not disable_all else "disabled")
+        self.keyword_button.config(state="normal" if self.segments and not disable_all else "disabled")
+        self.action_button.config(state="normal" if self.segments and not disable_all else "disabled")
+        self.event_button.config(state="normal" if self.segments and not disable_all else "disabled")
+        self.qa_button.config(state="normal" if self.segments and not disable_all else "disabled")
+        self.sentiment_button.config(state="normal" if self.segments and not disable_all else "disabled")
+        self.analyze_all_button.config(state="normal" if self.segments and not disable_all else "disabled")
+        self.export_button.config(state="normal" if self.segments and not disable_all else "disabled")
         self.browse_button.config(state="normal" if not disable_all else "disabled")
         self.model_menu.config(state="readonly" if not disable_all else "disabled")
+        self.whisper_size_menu.config(state="readonly" if not disable_all else "disabled")
+        self.single_pass_check.config(state="normal" if not disable_all else "disabled")
         self.language_menu.config(state="readonly" if not disable_all else "disabled")
         self.chunk_spinbox.config(state="normal" if not disable_all else "disabled")
         self.normalize_check.config(state="normal" if not disable_all else "disabled")
-        self.seek_scale.config(state="normal" if self.audio and not disable_all else "disabled")
+        self.vad_check.config(state="normal" if not disable_all else "disabled")
+        self.seek_scale.config(state="normal" if self.audio_source and not disable_all else "disabled")
         self.theme_combo.config(state="readonly" if not disable_all else "disabled")
         self.save_api_button.config(state="normal" if not disable_all else "disabled")
 
     def update_selected_duration(self):
         duration = self.end_time_var.get() - self.start_time_var.get()
         self.selected_duration_var.set(f"Selected Duration: {duration:.1f}s")
+        self.waveform.set_selection(self.start_time_var.get(), self.end_time_var.get())
 
     def animate_spinner(self):
         if self.is_transcribing or self.is_processing:
@@ -703,10 +785,10 @@ class VoiceVoyager:
             self.root.after(100, self.animate_spinner)
 
     def start_transcription(self):
-        if self.model_var.get() not in ["PocketSphinx (Offline)", "Whisper Local (Offline)"] and not self.check_internet():
+        if self.model_var.get() not in OFFLINE_MODELS and not self.check_internet():
             messagebox.showerror("No Internet", "Internet required for online transcription.")
             return
-        if self.model_var.get() == "Whisper Local (Offline)" and not whisper:
+        if self.model_var.get() == "Whisper Local (Offline)" and not whisper_available():
             messagebox.showerror("Whisper Missing", "Install 'openai-whisper' for offline Whisper: pip install openai-whisper")
             return
         self.is_transcribing = True
@@ -717,123 +799,190 @@ class VoiceVoyager:
         self.spinner_label.pack(side=RIGHT, padx=5)
         self.animate_spinner()
         self.progress["value"] = 0
-        self.transcription_thread = threading.Thread(target=self.transcribe_audio, daemon=True)
+        # Tk variables are read here, on the Tk thread, and handed to the worker
+        start_ms = self.start_time_var.get() * 1000
+        end_ms = self.end_time_var.get() * 1000 if self.end_time_var.get() > 0 else None
+        self.transcription_thread = threading.Thread(target=self.transcribe_audio, args=(self.transcription_settings(), start_ms, end_ms), daemon=True)
         self.transcription_thread.start()
 
     def clean_text(self, text):
-        text = re.sub(r'\*{1,3}(.*?)\*{1,3}', r'\1', text)
-        text = re.sub(r'_{1,2}(.*?)_{1,2}', r'\1', text)
-        text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
-        return text.strip()
+        return clean_text(text)
+
+    def transcription_settings(self):
+        return TranscriptionSettings(
+            model=self.model_var.get(),
+            language=self.language_var.get(),
+            chunk_duration=self.chunk_var.get(),
+            normalize=self.normalize_var.get(),
+            skip_silence=self.vad_var.get(),
+            whisper_model=self.whisper_size_var.get(),
+            whisper_single_pass=self.single_pass_var.get(),
+            backend_concurrency=self.preferences.get("backend_concurrency"),
+            upload_encoding=self.preferences.get("upload_encoding"),
+        )
 
-    def transcribe_audio(self):
+    def whisper_worker_count(self, size, single_pass=False):
+        """Processes a Whisper Local run uses; 1 means the model is loaded in this process"""
+        if single_pass:
+            return 1
+        budget = self.preferences.get("whisper_memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB)
+        return self.preferences.get("whisper_workers") or default_worker_count(size, budget)
+
+    def get_whisper_pool(self, settings):
+        """Worker pool for chunked Whisper Local runs, kept between runs of the same model size"""
+        if settings.model != "Whisper Local (Offline)":
+            return None
+        workers = self.whisper_worker_count(settings.whisper_model, settings.whisper_single_pass)
+        if self.whisper_pool and (self.whisper_pool.name != settings.whisper_model or self.whisper_pool.processes != workers):
+            self.whisper_pool.shutdown()
+            self.whisper_pool = None
+        if workers > 1 and self.whisper_pool is None:
+            # The workers' models take the whole memory budget, so drop any copy held here
+            model_registry.clear()
+            self.ui.insert(self.output_text, f"Starting {workers} Whisper workers...\n")
+            self.whisper_pool = WhisperProcessPool(settings.whisper_model, workers)
+        return self.whisper_pool
+
+    def transcribe_audio(self, settings, start_time, end_time=None):
         if not os.path.exists(self.file_path):
-            self.output_text.insert(tk.END, f"Error: File '{self.file_path}' does not exist.\n", "error")
-            self.finish_transcription(error=True)
+            self.ui.insert(self.output_text, f"Error: File '{self.file_path}' does not exist.\n", "error")
+            self.ui.call(self.finish_transcription, True)
             return
 
-        audio = self.audio
-        if self.normalize_var.get():
-            audio = normalize(audio.set_channels(1).set_frame_rate(16000))
-        total_duration = len(audio) / 1000
-        self.output_text.insert(tk.END, f"Total audio duration: {total_duration} seconds\n")
-
-        start_time = self.start_time_var.get() * 1000
-        end_time = self.end_time_var.get() * 1000 if self.end_time_var.get() > 0 else total_duration * 1000
-        audio = audio[start_time:end_time]
-        temp_file = tempfile.mktemp(suffix=".wav")
-        audio.export(temp_file, format="wav")
-
-        chunk_duration = self.chunk_var.get()
-        num_chunks = math.ceil((end_time - start_time) / 1000 / chunk_duration)
-        self.full_transcription = []
-        start_time_process = time.time()
-
-        model = self.model_var.get()
-        for i in range(num_chunks):
-            chunk_start = start_time + i * chunk_duration * 1000
-            chunk_end = min(start_time + (i + 1) * chunk_duration * 1000, end_time)
-            chunk = audio[chunk_start - start_time:chunk_end - start_time]
-            chunk_file = tempfile.mktemp(suffix=".wav")
-            chunk.export(chunk_file, format="wav")
+        source = self.audio_source
+        self.ui.insert(self.output_text, f"Total audio duration: {source.duration} seconds\n")
+        end_time = end_time or len(source)
+        self.reset_transcript()
+
+        def on_segment(line, ok):
+            if self.partial_shown:
+                self.partial_shown = False
+                self.ui.call(self.show_partial, None, key="partial")
+            self.ui.insert(self.output_text, line + "\n", () if ok else "error")
+
+        def on_partial(chunk_start, chunk_end, text):
+            # Text of the next chunk as Gemini writes it; replaced by the finished line
+            self.partial_shown = True
+            self.ui.call(self.show_partial, format_segment(chunk_start, chunk_end, text), key="partial")
+
+        def on_progress(completed, total, remaining):
+            self.ui.status(f"Processing ({completed}/{total}, ETA: {remaining:.1f}s)")
+            self.ui.set_progress((completed / total) * 100)
+
+        def on_message(text):
+            self.ui.insert(self.output_text, text + "\n")
 
-            try:
-                if model == "Gemini":
-                    chunk_text = self.clean_text(self.transcribe_with_gemini(chunk_file, chunk_start, chunk_end))
-                elif model == "Google Speech":
-                    chunk_text = self.clean_text(self.transcribe_with_google(chunk_file, chunk_start, chunk_end))
-                elif model == "Whisper":
-                    chunk_text = self.clean_text(self.transcribe_with_whisper(chunk_file, chunk_start, chunk_end))
-                elif model == "PocketSphinx (Offline)":
-                    chunk_text = self.clean_text(self.transcribe_with_pocketsphinx(chunk_file, chunk_start, chunk_end))
-                else:  # Whisper Local (Offline)
-                    chunk_text = self.clean_text(self.transcribe_with_whisper_local(chunk_file, chunk_start, chunk_end))
-                self.full_transcription.append(f"[{chunk_start/1000:.1f}-{chunk_end/1000:.1f}] {chunk_text}")
-                self.output_text.insert(tk.END, f"[{chunk_start/1000:.1f}-{chunk_end/1000:.1f}] {chunk_text}\n")
-                elapsed = time.time() - start_time_process
-                remaining = (elapsed / (i + 1)) * (num_chunks - (i + 1))
-                self.status_var.set(f"Processing ({i+1}/{num_chunks}, ETA: {remaining:.1f}s)")
-                self.progress["value"] = ((i + 1) / num_chunks) * 100
-                self.root.update_idletasks()
-            except Exception as e:
-                self.output_text.insert(tk.END, f"[{chunk_start/1000:.1f}-{chunk_end/1000:.1f}] [Error: {e}]\n", "error")
-                self.finish_transcription(error=True)
-                break
-            finally:
-                os.remove(chunk_file)
-        os.remove(temp_file)
-        self.finish_transcription()
-
-    def transcribe_with_gemini(self, chunk_file, start, end):
-        with open(chunk_file, "rb") as f:
-            audio_data = f.read()
-        prompt = f"Transcribe this audio in {self.language_var.get()} with speaker labels."
-        response = self.gemini_model.generate_content([prompt, {"mime_type": "audio/wav", "data": audio_data}])
-        return response.text
-
-    def transcribe_with_google(self, chunk_file, start, end):
-        r = sr.Recognizer()
         try:
-            with sr.AudioFile(chunk_file) as source:
-                audio = r.record(source)
-            return r.recognize_google(audio, language=self.language_var.get())
-        except sr.UnknownValueError:
-            return "[Error: Google Speech could not understand the audio]"
-        except sr.RequestError as e:
-            return f"[Error: Google Speech API request failed - {e}]"
-
-    def transcribe_with_whisper(self, chunk_file, start, end):
-        with open(chunk_file, "rb") as f:
-            response = self.openai_client.audio.transcriptions.create(model="whisper-1", file=f, language=self.language_var.get().split("-")[0])
-        return response.text
-
-    def transcribe_with_pocketsphinx(self, chunk_file, start, end):
-        r = sr.Recognizer()
-        with sr.AudioFile(chunk_file) as source:
-            audio = r.record(source)
-        return r.recognize_sphinx(audio, language="en-US")
-
-    def transcribe_with_whisper_local(self, chunk_file, start, end):
-        model = whisper.load_model("base")
-        result = model.transcribe(chunk_file, language=self.language_var.get().split("-")[0])
-        return result["text"]
-
-    def finish_transcription(self, error=False):
+            engine = TranscriptionEngine(settings, self.gemini_model, self.openai_client, self.transcription_cache, self.get_whisper_pool(settings), self.audio_cache)
+            journal = engine.open_journal(source)
+        except Exception as e:
+            self.ui.insert(self.output_text, f"Error: {e}\n", "error")
+            self.ui.call(self.finish_transcription, True)
+            return
+        try:
+            engine.transcribe(source, start_time, end_time, on_segment=on_segment, on_progress=on_progress, on_message=on_message, on_status=self.ui.status, journal=journal, on_partial=on_partial,
+                              segments=self.segments)
+        except TranscriptionError as e:
+            self.partial_shown = False
+            self.ui.call(self.show_partial, None, key="partial")
+            self.ui.insert(self.output_text, f"[{e.start_ms/1000:.1f}-{e.end_ms/1000:.1f}] [Error: {e}]\n", "error")
+            self.ui.insert(self.output_text, "Finished chunks are kept; transcribe again to resume.\n")
+            journal.close()
+            self.ui.call(self.finish_transcription, True)
+            return
+        except Exception as e:
+            self.partial_shown = False
+            self.ui.call(self.show_partial, None, key="partial")
+            self.ui.insert(self.output_text, f"Error: {e}\n", "error")
+            journal.close()
+            self.ui.call(self.finish_transcription, True)
+            return
+        if self.transcription_cache:
+            stats = self.transcription_cache.stats()
+            self.ui.insert(self.output_text, f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries ({stats['size_bytes'] / 1024:.0f} KB)\n")
+        timing = engine.timing_summary()
+        if timing:
+            self.ui.insert(self.output_text, f"Gemini: {timing}\n")
+        uploads = engine.upload_summary()
+        if uploads:
+            self.ui.insert(self.output_text, f"Upload: {uploads}\n")
+        if engine.failed:
+            # Keep the journal so the next run only retries the failed chunks
+            journal.close()
+            self.ui.insert(self.output_text, f"{len(engine.failed)} chunk(s) failed; transcribe again to retry them.\n", "error")
+        else:
+            journal.remove()
+        self.ui.call(self.finish_transcription, False, len(engine.failed))
+
+    def reset_transcript(self):
+        self.segments = SegmentStore()
+        self.segment_index = SegmentIndex(self.segments)
+
+    def show_partial(self, line):
+        """Replace the in-progress line at the end of the transcription with line (None to remove it)"""
+        for start, end in zip(*[iter(self.output_text.tag_ranges("partial"))] * 2):
+            self.output_text.delete(start, end)
+        if line:
+            self.output_text.insert(tk.END, line + "\n", "partial")
+            self.output_text.see(tk.END)
+
+    def finish_transcription(self, error=False, failed_chunks=0):
         self.is_transcribing = False
         self.spinner_label.pack_forget()
         if not error:
-            self.full_transcription = "\n".join(self.full_transcription)
-            output_file = os.path.splitext(self.file_path)[0] + f"_{self.model_var.get().lower().replace(' ', '_')}.txt"
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(self.full_transcription)
+            output_file = write_transcription(self.file_path, self.model_var.get(), self.segments)
             self.output_text.insert(tk.END, f"\nTranscription saved to '{output_file}'\n")
-            self.status_var.set("Completed")
+            self.status_var.set(f"Completed with {failed_chunks} failed chunk(s)" if failed_chunks else "Completed")
         else:
             self.status_var.set("Error occurred")
         self.update_playback_buttons()
 
+    def create_analyzer(self):
+        return TranscriptAnalyzer(self.gemini_model, self.analysis_cache,
+                                  window_tokens=self.preferences.get("analysis_window_tokens", DEFAULT_WINDOW_TOKENS),
+                                  concurrency=backend_concurrency("Gemini", self.preferences.get("backend_concurrency")))
+
+    def on_analysis_progress(self, done, total):
+        self.ui.status(f"Analyzing part {done}/{total}...")
+
+    def replace_text(self, widget, text, tag=()):
+        widget.delete(1.0, tk.END)
+        widget.insert(tk.END, text, tag)
+
+    def finish_processing(self, dialog=None):
+        self.is_processing = False
+        self.spinner_label.pack_forget()
+        self.update_playback_buttons()
+        if dialog:
+            dialog.destroy()
+
+    def stream_into(self, widget, header, tag=()):
+        """Clear widget, write header, and return an on_text callback that appends streamed text after it; safe from any thread"""
+        def start():
+            self.replace_text(widget, header, tag)
+            widget.mark_set("stream_start", "end-1c")
+            widget.mark_gravity("stream_start", tk.LEFT)
+
+        def on_text(piece, restart):
+            if restart:  # the request was retried; drop the partial answer
+                self.ui.call(widget.delete, "stream_start", tk.END)
+            self.ui.insert(widget, piece, tag, see=True)
+        self.ui.call(start)
+        return on_text
+
+    def analyze(self, operation, use_cache, on_text=None, **params):
+        """Run one analysis on the current transcription; returns (cleaned response text, the analyzer's timing summary)"""
+        analyzer = self.create_analyzer()
+        text = analyzer.analyze(operation, self.segments, use_cache=use_cache, on_progress=self.on_analysis_progress,
+                                on_text=on_text, **params)
+        return self.clean_text(text), analyzer.timing_summary()
+
+    def analysis_status(self, status, timing):
+        """Set the status bar from a worker thread, with the Gemini timing summary when there is one"""
+        self.ui.status(f"{status} | Gemini: {timing}" if timing else status)
+
     def translate_transcript(self):
-        if not self.full_transcription:
+        if not self.segments:
             self.show_custom_warning("No Transcription", "Please transcribe an audio file first.")
             return
         self.is_processing = True
@@ -855,26 +1004,22 @@ class VoiceVoyager:
         ttkb.Button(dialog, text="Translate", bootstyle="primary", command=lambda: self.perform_translation(target_lang_var.get(), dialog)).pack(pady=10)
 
     def perform_translation(self, target_lang, dialog):
-        
+        use_cache = self.analysis_cache_var.get()
+
         def do_translation():
             try:
-                response = self.gemini_model.generate_content(f"Translate this text to {target_lang}:\n\n{self.full_transcription}")
-                cleaned_text = self.clean_text(response.text)
-                self.output_text.delete(1.0, tk.END)
-                self.output_text.insert(tk.END, f"Translated to {target_lang}:\n{cleaned_text}\n")
-                self.status_var.set(f"Translated to {target_lang}")
+                cleaned_text, timing = self.analyze("translate", use_cache, self.stream_into(self.output_text, f"Translated to {target_lang}:\n"), language=target_lang)
+                self.ui.call(self.replace_text, self.output_text, f"Translated to {target_lang}:\n{cleaned_text}\n")
+                self.analysis_status(f"Translated to {target_lang}", timing)
             except Exception as e:
-                self.output_text.insert(tk.END, f"Error during translation: {e}\n", "error")
-                self.status_var.set("Translation Failed")
+                self.ui.insert(self.output_text, f"Error during translation: {e}\n", "error")
+                self.ui.status("Translation Failed")
             finally:
-                self.is_processing = False
-                self.spinner_label.pack_forget()
-                self.update_playback_buttons()
-                dialog.destroy()
+                self.ui.call(self.finish_processing, dialog)
         threading.Thread(target=do_translation, daemon=True).start()
 
     def extract_keywords(self):
-        if not self.full_transcription:
+        if not self.segments:
             self.show_custom_warning("No Transcription", "Please transcribe an audio file first.")
             return
         self.is_processing = True
@@ -882,25 +1027,22 @@ class VoiceVoyager:
         self.status_var.set("Extracting Keywords...")
         self.spinner_label.pack(side=RIGHT, padx=5)
         self.animate_spinner()
+        use_cache = self.analysis_cache_var.get()
 
         def do_extraction():
             try:
-                response = self.gemini_model.generate_content(f"Extract key phrases or words from this text:\n\n{self.full_transcription}")
-                cleaned_text = self.clean_text(response.text)
-                self.analysis_output.delete(1.0, tk.END)
-                self.analysis_output.insert(tk.END, "Key Phrases/Words:\n" + cleaned_text + "\n", "keyword")
-                self.status_var.set("Keywords Extracted")
+                cleaned_text, timing = self.analyze("keywords", use_cache, self.stream_into(self.analysis_output, "Key Phrases/Words:\n", "keyword"))
+                self.ui.call(self.replace_text, self.analysis_output, "Key Phrases/Words:\n" + cleaned_text + "\n", "keyword")
+                self.analysis_status("Keywords Extracted", timing)
             except Exception as e:
-                self.analysis_output.insert(tk.END, f"Error: {e}\n", "error")
-                self.status_var.set("Keyword Extraction Failed")
+                self.ui.insert(self.analysis_output, f"Error: {e}\n", "error")
+                self.ui.status("Keyword Extraction Failed")
             finally:
-                self.is_processing = False
-                self.spinner_label.pack_forget()
-                self.update_playback_buttons()
+                self.ui.call(self.finish_processing)
         threading.Thread(target=do_extraction, daemon=True).start()
 
     def detect_action_items(self):
-        if not self.full_transcription:
+        if not self.segments:
             
             self.show_custom_warning("No Transcription", "Please transcribe an audio file first.")
             return
@@ -909,26 +1051,23 @@ class VoiceVoyager:
         self.status_var.set("Detecting Actions...")
         self.spinner_label.pack(side=RIGHT, padx=5)
         self.animate_spinner()
+        use_cache = self.analysis_cache_var.get()
 
         def do_detection():
             try:
-                response = self.gemini_model.generate_content(f"Identify action items or tasks from this text:\n\n{self.full_transcription}")
-                cleaned_text = self.clean_text(response.text)
-                self.analysis_output.delete(1.0, tk.END)
-                self.analysis_output.insert(tk.END, "Action Items:\n" + cleaned_text + "\n", "action")
-                self.status_var.set("Actions Detected")
+                cleaned_text, timing = self.analyze("actions", use_cache, self.stream_into(self.analysis_output, "Action Items:\n", "action"))
+                self.ui.call(self.replace_text, self.analysis_output, "Action Items:\n" + cleaned_text + "\n", "action")
+                self.analysis_status("Actions Detected", timing)
             except Exception as e:
-                self.analysis_output.insert(tk.END, f"Error: {e}\n", "error")
-                self.status_var.set("Action Detection Failed")
+                self.ui.insert(self.analysis_output, f"Error: {e}\n", "error")
+                self.ui.status("Action Detection Failed")
             finally:
-                self.is_processing = False
-                self.spinner_label.pack_forget()
-                self.update_playback_buttons()
+                self.ui.call(self.finish_processing)
         threading.Thread(target=do_detection, daemon=True).start()
 
     def tag_audio_events(self):
         
-        if not self.full_transcription:
+        if not self.segments:
             
             self.show_custom_warning("No Transcription", "Please transcribe an audio file first.")
             return
@@ -937,25 +1076,22 @@ class VoiceVoyager:
         self.status_var.set("Tagging Events...")
         self.spinner_label.pack(side=RIGHT, padx=5)
         self.animate_spinner()
+        use_cache = self.analysis_cache_var.get()
 
         def do_tagging():
             try:
-                response = self.gemini_model.generate_content(f"Tag non-speech events (e.g., laughter, applause) in this transcription:\n\n{self.full_transcription}")
-                cleaned_text = self.clean_text(response.text)
-                self.analysis_output.delete(1.0, tk.END)
-                self.analysis_output.insert(tk.END, "Transcription with Events:\n" + cleaned_text + "\n")
-                self.status_var.set("Events Tagged")
+                cleaned_text, timing = self.analyze("events", use_cache, self.stream_into(self.analysis_output, "Transcription with Events:\n"))
+                self.ui.call(self.replace_text, self.analysis_output, "Transcription with Events:\n" + cleaned_text + "\n")
+                self.analysis_status("Events Tagged", timing)
             except Exception as e:
-                self.analysis_output.insert(tk.END, f"Error: {e}\n", "error")
-                self.status_var.set("Event Tagging Failed")
+                self.ui.insert(self.analysis_output, f"Error: {e}\n", "error")
+                self.ui.status("Event Tagging Failed")
             finally:
-                self.is_processing = False
-                self.spinner_label.pack_forget()
-                self.update_playback_buttons()
+                self.ui.call(self.finish_processing)
         threading.Thread(target=do_tagging, daemon=True).start()
 
     def ask_question(self):
-        if not self.full_transcription:
+        if not self.segments:
             self.show_custom_warning("No Transcription", "Please transcribe an audio file first.")
             return
         self.is_processing = True
@@ -981,22 +1117,24 @@ class VoiceVoyager:
             self.status_var.set("Processing Question...")
             self.spinner_label.pack(side=RIGHT, padx=5)
             self.animate_spinner()
+            use_cache = self.analysis_cache_var.get()
 
             def do_question():
                 try:
-                    response = self.gemini_model.generate_content(f"Answer this question based on the text:\n\n{self.full_transcription}\n\nQuestion: {question}")
-                    cleaned_text = self.clean_text(response.text)
-                    self.analysis_output.delete(1.0, tk.END)
-                    self.analysis_output.insert(tk.END, f"Q: {question}\nA: {cleaned_text}\n")
-                    self.status_var.set("Question Answered")
+                    analyzer = self.create_analyzer()
+                    answer, hits = analyzer.ask(question, self.segment_index, use_cache=use_cache,
+                                                on_progress=self.on_analysis_progress, on_text=self.stream_into(self.analysis_output, f"Q: {question}\nA: "))
+                    cleaned_text = self.clean_text(answer)
+                    self.ui.call(self.replace_text, self.analysis_output, f"Q: {question}\nA: {cleaned_text}\n")
+                    if hits:
+                        sources = ", ".join(self.segment_index.times(hit) for hit in sorted(hits))
+                        self.ui.insert(self.analysis_output, f"\nBased on {len(hits)} matching segment(s): {sources}\n")
+                    self.analysis_status("Question Answered", analyzer.timing_summary())
                 except Exception as e:
-                    self.analysis_output.insert(tk.END, f"Error: {e}\n", "error")
-                    self.status_var.set("Question Processing Failed")
+                    self.ui.insert(self.analysis_output, f"Error: {e}\n", "error")
+                    self.ui.status("Question Processing Failed")
                 finally:
-                    self.is_processing = False
-                    self.spinner_label.pack_forget()
-                    self.update_playback_buttons()
-                    dialog.destroy()
+                    self.ui.call(self.finish_processing, dialog)
             threading.Thread(target=do_question, daemon=True).start()
         else:
             self.is_processing = False
@@ -1004,7 +1142,7 @@ class VoiceVoyager:
             dialog.destroy()
 
     def sentiment_analysis(self):
-        if not self.full_transcription:
+        if not self.segments:
             self.show_custom_warning("No Transcription", "Please transcribe an audio file first.")
             return
         self.is_processing = True
@@ -1012,24 +1150,48 @@ class VoiceVoyager:
         self.status_var.set("Analyzing Sentiment...")
         self.spinner_label.pack(side=RIGHT, padx=5)
         self.animate_spinner()
+        use_cache = self.analysis_cache_var.get()
 
         def do_sentiment():
             try:
-                response = self.gemini_model.generate_content(f"Analyze the sentiment and tone of this text (e.g., confident, sad, happy):\n\n{self.full_transcription}")
-                cleaned_text = self.clean_text(response.text)
+                cleaned_text, timing = self.analyze("sentiment", use_cache, self.stream_into(self.analysis_output, "Sentiment Analysis:\n", "sentiment"))
                 sentiment_with_emojis = self.add_emojis(cleaned_text)
-                self.analysis_output.delete(1.0, tk.END)
-                self.analysis_output.insert(tk.END, "Sentiment Analysis:\n" + sentiment_with_emojis + "\n", "sentiment")
-                self.status_var.set("Sentiment Analyzed")
+                self.ui.call(self.replace_text, self.analysis_output, "Sentiment Analysis:\n" + sentiment_with_emojis + "\n", "sentiment")
+                self.analysis_status("Sentiment Analyzed", timing)
             except Exception as e:
-                self.analysis_output.insert(tk.END, f"Error: {e}\n", "error")
-                self.status_var.set("Sentiment Analysis Failed")
+                self.ui.insert(self.analysis_output, f"Error: {e}\n", "error")
+                self.ui.status("Sentiment Analysis Failed")
             finally:
-                self.is_processing = False
-                self.spinner_label.pack_forget()
-                self.update_playback_buttons()
+                self.ui.call(self.finish_processing)
         threading.Thread(target=do_sentiment, daemon=True).start()
 
+    def analyze_all(self):
+        if not self.segments:
+            self.show_custom_warning("No Transcription", "Please transcribe an audio file first.")
+            return
+        self.is_processing = True
+        self.update_playback_buttons()
+        self.status_var.set("Analyzing...")
+        self.spinner_label.pack(side=RIGHT, padx=5)
+        self.animate_spinner()
+        use_cache = self.analysis_cache_var.get()
+
+        def do_analysis():
+            try:
+                analyzer = self.create_analyzer()
+                results = analyzer.run_all(self.segments, use_cache=use_cache, on_progress=self.on_analysis_progress)
+                self.ui.call(self.replace_text, self.analysis_output, "Key Phrases/Words:\n" + self.clean_text(results["keywords"]) + "\n\n", "keyword")
+                self.ui.insert(self.analysis_output, "Action Items:\n" + self.clean_text(results["actions"]) + "\n\n", "action")
+                self.ui.insert(self.analysis_output, "Sentiment Analysis:\n" + self.add_emojis(self.clean_text(results["sentiment"])) + "\n\n", "sentiment")
+                self.ui.insert(self.analysis_output, "Events:\n" + self.clean_text(results["events"]) + "\n")
+                self.analysis_status("Analysis Complete", analyzer.timing_summary())
+            except Exception as e:
+                self.ui.insert(self.analysis_output, f"Error: {e}\n", "error")
+                self.ui.status("Analysis Failed")
+            finally:
+                self.ui.call(self.finish_processing)
+        threading.Thread(target=do_analysis, daemon=True).start()
+
     def add_emojis(self, text):
         emoji_map = {
             "happy": "😊", "sad": "😢", "confident": "💪", "angry": "😠", "neutral": "😐",
@@ -1040,7 +1202,7 @@ class VoiceVoyager:
         return text
 
     def export_transcription(self):
-        if not self.full_transcription:
+        if not self.segments:
             self.show_custom_warning("No Transcription", "Please transcribe an audio file first.")
             return
         self.is_processing = True
@@ -1056,85 +1218,43 @@ class VoiceVoyager:
         # Reset is_processing when the dialog is closed
         dialog.protocol("WM_DELETE_WINDOW", lambda: self.on_dialog_close(dialog))
 
-        ttkb.Label(dialog, text="Enter file type (pdf/docx):").pack(pady=10)
+        ttkb.Label(dialog, text=f"Enter file types ({', '.join(EXPORT_FORMATS)}):").pack(pady=10)
         file_type_var = tk.StringVar()
         ttkb.Entry(dialog, textvariable=file_type_var).pack(pady=10)
         ttkb.Button(dialog, text="Export", bootstyle="primary", command=lambda: self.perform_export(file_type_var.get(), dialog)).pack(pady=10)
 
-    def perform_export(self, file_type, dialog):
-        # Validate file_type before starting the thread
-        file_type = file_type.lower().strip()
-        if file_type not in ["pdf", "docx"]:
-            error_dialog = tk.Toplevel(self.root)
-            self.set_window_icon(error_dialog)
-            error_dialog.title("Invalid Type")
-            self.center_window(error_dialog, 400, 150)
-            error_dialog.transient(self.root)
-            error_dialog.grab_set()
-            ttkb.Label(error_dialog, text="Please enter 'pdf' or 'docx'.").pack(pady=10)
-            ttkb.Button(error_dialog, text="OK", bootstyle="primary", command=error_dialog.destroy).pack(pady=10)
-            self.is_processing = False
-            self.update_playback_buttons()
-            dialog.destroy()
+    def perform_export(self, file_types, dialog):
+        # Validate the file types before starting the thread
+        file_types = list(dict.fromkeys(re.findall(r"\w+", file_types.lower())))
+        if not file_types or any(file_type not in EXPORT_FORMATS for file_type in file_types):
+            self.show_dialog("Invalid Type", f"Please enter one or more of: {', '.join(EXPORT_FORMATS)}.")
+            self.on_dialog_close(dialog)
+            return
+        directory = filedialog.askdirectory(parent=dialog, title="Export to folder", initialdir=os.path.dirname(os.path.abspath(self.file_path)))
+        if not directory:
+            self.on_dialog_close(dialog)
             return
 
         self.status_var.set("Exporting...")
         self.spinner_label.pack(side=RIGHT, padx=5)
         self.animate_spinner()
+        outputs = [(file_type, export_path(self.file_path, file_type, directory)) for file_type in file_types]
+        title = f"Transcription of {os.path.basename(self.file_path)}"
+        details = f"Model: {self.model_var.get()} | Language: {self.language_var.get()}"
 
         def do_export():
             try:
-                output_file = os.path.splitext(self.file_path)[0] + f"_transcription.{file_type}"
-                if file_type == "pdf":
-                    doc = SimpleDocTemplate(output_file, pagesize=letter)
-                    styles = getSampleStyleSheet()
-                    story = [
-                        Paragraph(f"Transcription of {os.path.basename(self.file_path)}", styles["Title"]),
-                        Spacer(1, 12),
-                        Paragraph(f"Model: {self.model_var.get()} | Language: {self.language_var.get()}", styles["Normal"]),
-                        Spacer(1, 12),
-                        Paragraph("Transcription:", styles["Heading2"]),
-                        Spacer(1, 6)
-                    ]
-                    for line in self.full_transcription.split("\n"):
-                        story.append(Paragraph(line, styles["Normal"]))
-                        story.append(Spacer(1, 6))
-                    doc.build(story)
-                elif file_type == "docx":
-                    doc = docx.Document()
-                    doc.add_heading(f"Transcription of {os.path.basename(self.file_path)}", 0)
-                    doc.add_paragraph(f"Model: {self.model_var.get()} | Language: {self.language_var.get()}")
-                    doc.add_heading("Transcription:", level=2)
-                    for line in self.full_transcription.split("\n"):
-                        doc.add_paragraph(line)
-                    doc.save(output_file)
-
+                # All formats are written together in one pass over the segments
+                paths = export_segments(self.segments, outputs, title, details,
+                                        on_progress=lambda done, total: self.ui.status(f"Exporting ({done}/{total} segments)..."))
                 # Show success message with custom dialog
-                success_dialog = tk.Toplevel(self.root)
-                self.set_window_icon(success_dialog)
-                success_dialog.title("Export")
-                self.center_window(success_dialog, 830, 150)
-                success_dialog.transient(self.root)
-                success_dialog.grab_set()
-                ttkb.Label(success_dialog, text=f"Transcription exported to '{output_file}'").pack(pady=10)
-                ttkb.Button(success_dialog, text="OK", bootstyle="primary", command=success_dialog.destroy).pack(pady=10)
-                self.status_var.set("Export Completed")
+                self.ui.call(self.show_dialog, "Export", "Transcription exported to:\n" + "\n".join(paths), 830)
+                self.ui.status("Export Completed")
             except Exception as e:
-                # Show error message with custom dialog
-                error_dialog = tk.Toplevel(self.root)
-                self.set_window_icon(error_dialog)
-                error_dialog.title("Export Failed")
-                self.center_window(error_dialog, 400, 150)
-                error_dialog.transient(self.root)
-                error_dialog.grab_set()
-                ttkb.Label(error_dialog, text=f"Error during export: {e}").pack(pady=10)
-                ttkb.Button(error_dialog, text="OK", bootstyle="primary", command=error_dialog.destroy).pack(pady=10)
-                self.status_var.set("Export Failed")
+                self.ui.call(self.show_dialog, "Export Failed", f"Error during export: {e}")
+                self.ui.status("Export Failed")
             finally:
-                self.is_processing = False
-                self.spinner_label.pack_forget()
-                self.update_playback_buttons()
-                dialog.destroy()
+                self.ui.call(self.finish_processing, dialog)
         threading.Thread(target=do_export, daemon=True).start()
 
     def clear_output(self):
@@ -1142,9 +1262,11 @@ class VoiceVoyager:
         self.output_text.delete(1.0, tk.END)
         self.analysis_output.delete(1.0, tk.END)
         self.file_path = None
-        self.audio = None
+        self.audio_source = None
+        self.player = None
+        self.waveform.set_peaks(None)
         self.audio_duration = 0
-        self.full_transcription = ""
+        self.reset_transcript()
         self.file_path_var.set("No file selected")
         self.duration_label.config(text="Duration: N/A")
         self.seek_scale.config(to=0)
@@ -1161,6 +1283,11 @@ class VoiceVoyager:
         self.update_playback_buttons()
 
 if __name__ == "__main__":
+    # In the frozen exe, Whisper worker processes start the exe again; this makes them act as workers instead of opening a window
+    multiprocessing.freeze_support()
     root = ttkb.Window()
     app = VoiceVoyager(root)
+    if "--exit-when-ready" in sys.argv:
+        # Used by voicevoyager_bench.py --startup: report when the window is up and idle, then quit
+        root.after_idle(lambda: (print(f"ready {time.time()}", flush=True), root.destroy()))
     root.mainloop()
\ No newline at end of file
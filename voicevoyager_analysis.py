@@ -0,0 +1,321 @@
+import heapq
+import json
+import math
+import re
+import threading
+import time
+
+from voicevoyager_cache import cache_key
+from voicevoyager_engine import GEMINI_MODEL, dispatch_ordered
+from voicevoyager_segments import SegmentStore
+
+DEFAULT_ANALYSIS_CACHE_MB = 64
+# Transcript tokens per request. Longer transcripts are analyzed a window at a
+# time and the partial results merged, which keeps each request quick.
+DEFAULT_WINDOW_TOKENS = 30000
+# Operations whose answer is as long as the input must also fit the model's output limit
+FULL_LENGTH_WINDOW_TOKENS = 6000
+FULL_LENGTH_OPERATIONS = ("translate", "events")
+PART_SEPARATOR = "\n\n---\n\n"
+NONE_FOUND = "None found."
+
+ANALYSIS_PROMPTS = {
+    "translate": "Translate this text to {language}:\n\n{text}",
+    "keywords": "Extract key phrases or words from this text:\n\n{text}",
+    "actions": "Identify action items or tasks from this text:\n\n{text}",
+    "events": "Tag non-speech events (e.g., laughter, applause) in this transcription:\n\n{text}",
+    "question": "Answer this question based on the text:\n\n{text}\n\nQuestion: {question}",
+    "sentiment": "Analyze the sentiment and tone of this text (e.g., confident, sad, happy):\n\n{text}",
+    "all": (
+        "Analyze this transcription and reply with only a JSON object with these keys:\n"
+        '"keywords": a list of key phrases or words,\n'
+        '"actions": a list of action items or tasks,\n'
+        '"sentiment": a short description of the sentiment and tone (e.g., confident, sad, happy),\n'
+        '"events": a list of non-speech events (e.g., laughter, applause), each with its timestamp.\n\n{text}'
+    ),
+    "question_context": ("Answer the question using only these excerpts from a transcription. Each excerpt starts with its "
+                         "[start-end] time in seconds. Cite the timestamps of the excerpts you used, e.g. [12.0-18.5]. "
+                         "If the excerpts do not contain the answer, say so.\n\n{text}\n\nQuestion: {question}"),
+    "reduce_keywords": ("These are key phrase lists from consecutive parts of one transcription. "
+                        "Merge them into a single list without duplicates, most important first:\n\n{text}"),
+    "reduce_actions": ("These are action item lists from consecutive parts of one transcription. "
+                       "Merge them into one list, combining duplicates and keeping any owners and deadlines:\n\n{text}"),
+    "reduce_sentiment": ("These are sentiment and tone analyses of consecutive parts of one transcription. "
+                         "Describe the overall sentiment and tone (e.g., confident, sad, happy) and how it changes:\n\n{text}"),
+    "reduce_question": ("These are answers to the question below, each based on one part of a transcription. Combine them into one answer, "
+                        "ignoring parts that do not contain the answer:\n\n{text}\n\nQuestion: {question}"),
+}
+
+# Operations covered by the combined "all" request, in display order
+COMBINED_OPERATIONS = ["keywords", "actions", "sentiment", "events"]
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token), enough for budgeting windows"""
+    return len(text) // 4 + 1
+
+
+def pack(pieces, max_tokens, separator=""):
+    """Join consecutive pieces into groups of at most max_tokens; a piece over the budget is a group of its own"""
+    groups, current, size = [], [], 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and size + tokens > max_tokens:
+            groups.append(separator.join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        groups.append(separator.join(current))
+    return groups
+
+
+def split_transcript(segments, max_tokens):
+    """Split a SegmentStore into windows of whole "[start-end] ..." segment lines"""
+    return pack(list(segments.lines()), max_tokens, "\n")
+
+
+def describe_item(item):
+    if isinstance(item, dict):
+        return ": ".join(str(value) for value in item.values())
+    return str(item)
+
+
+def parse_combined(text):
+    """Split the JSON answer to the "all" prompt into {operation: text}; raises ValueError if it is not usable"""
+    match = re.search(r"\{.*\}", text, re.DOTALL)  # tolerate code fences or a preamble
+    if not match:
+        raise ValueError("response contains no JSON object")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict) or any(operation not in data for operation in COMBINED_OPERATIONS):
+        raise ValueError("response is missing analysis keys")
+    results = {}
+    for operation in COMBINED_OPERATIONS:
+        value = data[operation]
+        if isinstance(value, list):
+            value = "\n".join(f"- {describe_item(item)}" for item in value) or NONE_FOUND
+        results[operation] = str(value)
+    return results
+
+
+class TranscriptAnalyzer:
+    """Gemini analysis of a transcript, with repeated requests answered from a ResultCache.
+
+    Responses are keyed by a hash of the transcript, the operation, its
+    parameters (target language, question) and the model name, so any change
+    to one of them asks Gemini again. With use_cache=False the cached answer
+    is ignored but the fresh one still replaces it.
+    """
+
+    def __init__(self, gemini_model, cache=None, model_name=GEMINI_MODEL, window_tokens=DEFAULT_WINDOW_TOKENS, concurrency=4):
+        self.gemini_model = gemini_model
+        self.cache = cache
+        self.model_name = model_name
+        self.window_tokens = window_tokens
+        self.concurrency = concurrency
+        self.requests = 0
+        self.cache_hits = 0
+        self.timings = []  # (operation, seconds to first text, total seconds) per request
+        self._lock = threading.Lock()
+
+    def timing_summary(self):
+        """One line on request latency and cache hits since the analyzer was created, or None if there were neither"""
+        with self._lock:
+            timings = list(self.timings)
+            hits = self.cache_hits
+        if not timings:
+            return "answered from cache" if hits else None
+        firsts = sorted(first for _, first, _ in timings)
+        totals = sorted(total for _, _, total in timings)
+        summary = (f"{len(timings)} request(s): first text after {firsts[len(firsts) // 2]:.2f}s median, "
+                   f"complete after {totals[len(totals) // 2]:.2f}s median ({totals[-1]:.2f}s slowest)")
+        return summary + (f", {hits} from cache" if hits else "")
+
+    def key(self, operation, text, params):
+        return cache_key("analysis", self.model_name, operation, sorted(params.items()), cache_key(text))
+
+    def run(self, operation, text, use_cache=True, parse=None, generation_config=None, on_text=None, **params):
+        """Response text for one of ANALYSIS_PROMPTS applied to text, passed through parse if given.
+
+        With on_text, the response is streamed and on_text(piece, restart) is
+        called as text arrives (once with the whole text on a cache hit). A
+        response that parse rejects (by raising) is not cached.
+        """
+        key = self.key(operation, text, params) if self.cache else None
+        if key and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.cache_hits += 1
+                if on_text:
+                    on_text(cached, False)
+                return parse(cached) if parse else cached
+        with self._lock:
+            self.requests += 1
+        prompt = ANALYSIS_PROMPTS[operation].format(text=text, **params)
+        options = {"generation_config": generation_config} if generation_config else {}
+        if on_text:
+            response_text, first, total = self.gemini_model.stream_content(prompt, on_text, **options)
+        else:
+            started = time.monotonic()
+            response_text = self.gemini_model.generate_content(prompt, **options).text
+            first = total = time.monotonic() - started
+        with self._lock:
+            self.timings.append((operation, first, total))
+        result = parse(response_text) if parse else response_text
+        if key:
+            self.cache.put(key, response_text)
+        return result
+
+    def run_window_all(self, text, use_cache=True):
+        """{operation: text} for COMBINED_OPERATIONS from one JSON request, or from one request each if that fails"""
+        try:
+            return self.run("all", text, use_cache, parse=parse_combined, generation_config={"response_mime_type": "application/json"})
+        except ValueError as e:  # json.JSONDecodeError included
+            print(f"Combined analysis unusable ({e}); running analyses separately")
+        return {operation: self.run(operation, text, use_cache) for operation in COMBINED_OPERATIONS}
+
+    def map(self, windows, worker, on_progress=None, on_result=None):
+        """worker(window) for every window, up to self.concurrency at once; results in window order.
+
+        on_result(result) is called for each result as soon as it and all earlier ones are done.
+        """
+        done = [0]
+
+        def on_complete(index, window):
+            done[0] += 1
+            if on_progress:
+                on_progress(done[0], len(windows))
+
+        results = []
+        for _, _, result in dispatch_ordered(windows, worker, self.concurrency, on_complete):
+            results.append(result)
+            if on_result:
+                on_result(result)
+        return results
+
+    def reduce(self, operation, partials, use_cache=True, on_text=None, **params):
+        """Merge per-window results; concatenated in order when the operation has no merge prompt.
+
+        on_text receives the final merge request's output as it streams.
+        """
+        if len(partials) == 1:
+            if on_text:
+                on_text(partials[0], False)
+            return partials[0]
+        if "reduce_" + operation not in ANALYSIS_PROMPTS:
+            return "\n\n".join(partial for partial in partials if partial.strip() and partial != NONE_FOUND) or NONE_FOUND
+        # Merge in rounds while the partial results together are still too long for one request
+        while True:
+            groups = pack(partials, self.window_tokens, PART_SEPARATOR)
+            if len(groups) == 1 or len(groups) == len(partials):  # fits, or no two partials fit together
+                return self.run("reduce_" + operation, PART_SEPARATOR.join(groups), use_cache, on_text=on_text, **params)
+            partials = self.map(groups, lambda group: self.run("reduce_" + operation, group, use_cache, **params))
+
+    def analyze(self, operation, segments, use_cache=True, on_progress=None, on_text=None, **params):
+        """Like run() for a SegmentStore, but a transcript over the window budget is analyzed a window at a time and merged.
+
+        on_text streams the single request, the final merge request, or, for
+        operations that are concatenated, each window's result in order.
+        """
+        budget = min(self.window_tokens, FULL_LENGTH_WINDOW_TOKENS) if operation in FULL_LENGTH_OPERATIONS else self.window_tokens
+        text = segments.to_text()
+        windows = split_transcript(segments, budget) if estimate_tokens(text) > budget else [text]
+        if len(windows) == 1:
+            return self.run(operation, text, use_cache, on_text=on_text, **params)
+        if "reduce_" + operation in ANALYSIS_PROMPTS:
+            partials = self.map(windows, lambda window: self.run(operation, window, use_cache, **params), on_progress)
+            return self.reduce(operation, partials, use_cache, on_text=on_text, **params)
+        on_result = (lambda partial: on_text(partial + "\n\n", False)) if on_text else None
+        partials = self.map(windows, lambda window: self.run(operation, window, use_cache, **params), on_progress, on_result)
+        return self.reduce(operation, partials, use_cache, **params)
+
+    def ask(self, question, index, use_cache=True, k=8, neighbors=1, on_progress=None, on_text=None):
+        """Answer from the index's top-k segments and their neighbors; returns (answer, ids of the matching segments).
+
+        When no segment shares a word with the question, the whole transcript is used instead.
+        """
+        hits, context = index.context(question, k, neighbors)
+        if not hits:
+            return self.analyze("question", index.segments, use_cache, on_progress, on_text, question=question), []
+        return self.run("question_context", context, use_cache, on_text=on_text, question=question), hits
+
+    def run_all(self, segments, use_cache=True, on_progress=None):
+        """{operation: text} for COMBINED_OPERATIONS of a SegmentStore, with one combined request per window"""
+        text = segments.to_text()
+        windows = split_transcript(segments, self.window_tokens) if estimate_tokens(text) > self.window_tokens else [text]
+        if len(windows) == 1:
+            return self.run_window_all(text, use_cache)
+        partials = self.map(windows, lambda window: self.run_window_all(window, use_cache), on_progress)
+        results = {operation: self.reduce(operation, [partial[operation] for partial in partials], use_cache)
+                   for operation in COMBINED_OPERATIONS}
+        return results
+
+
+WORD = re.compile(r"\w+")
+STOPWORDS = frozenset("""a an and are as at be but by did do does for from had has have he her him his how i if in is it its
+me my no not of on or our she so that the their them then there they this to was we were what when where which who
+why will with you your""".split())
+
+
+def tokenize(text):
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+class SegmentIndex:
+    """BM25 index over the segments of a SegmentStore, caught up with the store before each search.
+
+    Postings are kept per term, so indexing new segments and answering a
+    query only touch the terms involved, however long the transcript grows.
+    Segment ids are the store's indices; failed segments are not indexed.
+    """
+
+    def __init__(self, segments=None, k1=1.5, b=0.75):
+        self.segments = SegmentStore() if segments is None else segments
+        self.k1 = k1
+        self.b = b
+        self.lengths = []
+        self.postings = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def update(self):
+        """Index the segments added to the store since the last update"""
+        for segment_id in range(len(self.lengths), len(self.segments)):
+            terms = tokenize(self.segments.text(segment_id)) if self.segments.ok[segment_id] else []
+            self.lengths.append(len(terms))
+            self.total_length += len(terms)
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                self.postings.setdefault(term, []).append((segment_id, count))
+
+    def search(self, query, k=8):
+        """Indices of the k best matching segments, best first; segments sharing no term are left out"""
+        self.update()
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average_length = self.total_length / count or 1
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for segment_id, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[segment_id] / average_length)
+                scores[segment_id] = scores.get(segment_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(k, scores, key=scores.get)
+
+    def context(self, query, k=8, neighbors=1):
+        """(matching segment ids, context text): the top-k segments with their neighbors, in transcript order"""
+        hits = self.search(query, k)
+        chosen = sorted({i for hit in hits for i in range(max(0, hit - neighbors), min(len(self.lengths), hit + neighbors + 1))})
+        return hits, "\n".join(self.segments.line(i) for i in chosen if self.segments.ok[i])
+
+    def times(self, segment_id):
+        return self.segments.times(segment_id)
@@ -0,0 +1,728 @@
+import io
+import mmap
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import wave
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+from pydub import AudioSegment
+
+from voicevoyager_cache import cache_key
+
+PREPARED_SAMPLE_RATE = 16000
+DEFAULT_PREPARED_MB = 512
+PREPARE_WINDOW_MS = 60000  # audio decoded per step while preparing or finding the peak
+GAIN_BLOCK = 1 << 18  # samples scaled at a time by apply_gain
+
+
+def set_ffmpeg_path():
+    try:
+        subprocess.run(["ffmpeg", "-version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        print("FFmpeg found in system PATH.")
+        return "ffmpeg"
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        if os.name == 'nt':
+            ffmpeg_path = os.path.join(base_path, 'ffmpeg', 'win', 'ffmpeg.exe')
+        else:
+            ffmpeg_path = os.path.join(base_path, 'ffmpeg', 'mac' if os.uname().sysname == 'Darwin' else 'linux', 'ffmpeg')
+            os.chmod(ffmpeg_path, 0o755)
+        if not os.path.exists(ffmpeg_path):
+            raise FileNotFoundError(f"FFmpeg not found at {ffmpeg_path}. Ensure it is bundled or installed.")
+        AudioSegment.ffmpeg = ffmpeg_path
+        AudioSegment.converter = ffmpeg_path
+        print(f"Using bundled FFmpeg at {ffmpeg_path}")
+        return ffmpeg_path
+
+
+_ffmpeg_probe = None
+_ffmpeg_probe_lock = threading.Lock()
+
+
+def start_ffmpeg_probe():
+    """Run set_ffmpeg_path() once on a background thread; returns a Future for its result.
+
+    Probing runs ffmpeg, so the GUI starts it here instead of waiting for it
+    before the window appears, and calls .result() when audio is first needed.
+    """
+    global _ffmpeg_probe
+    with _ffmpeg_probe_lock:
+        if _ffmpeg_probe is None:
+            _ffmpeg_probe = probe = Future()
+
+            def run():
+                try:
+                    probe.set_result(set_ffmpeg_path())
+                except Exception as e:
+                    probe.set_exception(e)
+
+            threading.Thread(target=run, daemon=True).start()
+        return _ffmpeg_probe
+
+
+# Upload encodings: ffmpeg output options, MIME type and file extension. WAV is written directly.
+UPLOAD_CODECS = {
+    "wav": (None, "audio/wav", "wav"),
+    "flac": (["-c:a", "flac", "-f", "flac"], "audio/flac", "flac"),
+    "opus": (["-c:a", "libopus", "-application", "voip", "-f", "ogg"], "audio/ogg", "ogg"),
+    "mp3": (["-c:a", "libmp3lame", "-f", "mp3"], "audio/mp3", "mp3"),
+}
+
+def sample_peak(samples):
+    """Largest absolute value of int16 samples, without widening them"""
+    return max(int(samples.max()), -int(samples.min())) if samples.size else 0
+
+
+def normalize_gain(peak, headroom=0.1):
+    """Gain that brings peak to `headroom` dB below full scale, or None for silence"""
+    return 32767 * 10 ** (-headroom / 20) / peak if peak else None
+
+
+def apply_gain(samples, gain, out=None):
+    """int16 samples times gain, rounded and clipped; out may be samples itself.
+
+    Scaling goes through one float block of GAIN_BLOCK samples, so the
+    temporaries stay small whatever the length.
+    """
+    out = np.empty_like(samples) if out is None else out
+    block = np.empty(min(GAIN_BLOCK, len(samples)), dtype=np.float64)
+    for start in range(0, len(samples), GAIN_BLOCK):
+        part = block[:min(GAIN_BLOCK, len(samples) - start)]
+        part[:] = samples[start:start + len(part)]
+        part *= gain
+        np.rint(part, out=part)
+        np.clip(part, -32768, 32767, out=part)
+        out[start:start + len(part)] = part
+    return out
+
+
+_encoders = {}  # ffmpeg path -> names of its audio encoders, or None if they could not be listed
+_encoders_lock = threading.Lock()
+
+
+def encoder_available(codec, ffmpeg=None):
+    """Whether ffmpeg was built with the encoder for one of UPLOAD_CODECS; asks ffmpeg once per path"""
+    options = UPLOAD_CODECS[codec][0]
+    if options is None:
+        return True
+    ffmpeg = ffmpeg or AudioSegment.converter
+    with _encoders_lock:
+        if ffmpeg not in _encoders:
+            try:
+                result = subprocess.run([ffmpeg, "-hide_banner", "-encoders"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
+                lines = result.stdout.decode("utf-8", errors="replace").splitlines()
+                _encoders[ffmpeg] = {line.split()[1] for line in lines if len(line.split()) > 1 and line.split()[0].startswith("A")}
+            except (OSError, subprocess.SubprocessError):
+                _encoders[ffmpeg] = None
+        encoders = _encoders[ffmpeg]
+    # Without a list, assume it is there and let encoding report any problem
+    return encoders is None or options[options.index("-c:a") + 1] in encoders
+
+
+CHANNEL_LAYOUTS = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "4.0": 4, "5.0": 5, "5.1": 6, "6.1": 7, "7.1": 8}
+
+
+class PcmBuffer:
+    """Signed 16-bit little-endian PCM held in memory.
+
+    Slicing returns a new PcmBuffer over the same memory (a memoryview), so
+    chunks of a long recording never copy or touch the disk until a backend
+    asks for a specific representation.
+    """
+
+    sample_width = 2
+
+    def __init__(self, data, sample_rate, channels=1):
+        self.data = memoryview(data).cast("B")
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @property
+    def frame_width(self):
+        return self.sample_width * self.channels
+
+    @property
+    def frame_count(self):
+        return len(self.data) // self.frame_width
+
+    @property
+    def duration(self):
+        return self.frame_count / self.sample_rate
+
+    def __len__(self):
+        """Length in milliseconds, matching pydub.AudioSegment"""
+        return int(round(self.duration * 1000))
+
+    def frame_at(self, ms):
+        return max(0, min(self.frame_count, int(round(ms * self.sample_rate / 1000))))
+
+    def slice_ms(self, start_ms, end_ms):
+        start = self.frame_at(start_ms) * self.frame_width
+        end = self.frame_at(end_ms) * self.frame_width
+        return PcmBuffer(self.data[start:end], self.sample_rate, self.channels)
+
+    def to_bytes(self):
+        return self.data.tobytes()
+
+    def to_wav_bytes(self):
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(self.channels)
+            wav.setsampwidth(self.sample_width)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(self.data)
+        return buffer.getvalue()
+
+    def encode(self, codec, bitrate=None, ffmpeg=None):
+        """Encode as one of UPLOAD_CODECS (bitrate like "32k" applies to lossy codecs) and return the file bytes"""
+        options = UPLOAD_CODECS[codec][0]
+        if options is None:
+            return self.to_wav_bytes()
+        command = [ffmpeg or AudioSegment.converter, "-v", "error", "-f", "s16le", "-ar", str(self.sample_rate), "-ac", str(self.channels),
+                   "-i", "pipe:0"] + options
+        if bitrate and codec != "flac":
+            command += ["-b:a", str(bitrate)]
+        result = subprocess.run(command + ["pipe:1"], input=self.data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0 or not result.stdout:
+            raise RuntimeError(f"ffmpeg could not encode {codec}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+        return result.stdout
+
+    def normalized(self, headroom=0.1):
+        """Peak-normalize to `headroom` dB below full scale, like pydub.effects.normalize"""
+        return self.with_gain(normalize_gain(sample_peak(np.frombuffer(self.data, dtype="<i2")), headroom))
+
+    def with_gain(self, gain):
+        """A copy scaled by gain (None leaves it unchanged)"""
+        if gain is None:
+            return self
+        return PcmBuffer(apply_gain(np.frombuffer(self.data, dtype="<i2"), gain), self.sample_rate, self.channels)
+
+    def to_mono(self):
+        if self.channels == 1:
+            return self
+        samples = np.frombuffer(self.data, dtype="<i2").reshape(-1, self.channels)
+        return PcmBuffer(samples.mean(axis=1).astype("<i2").tobytes(), self.sample_rate)
+
+    def to_float32(self):
+        """Mono float32 samples in [-1, 1], the input format Whisper expects"""
+        samples = np.frombuffer(self.data, dtype="<i2")
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        return samples.astype(np.float32) / 32768.0
+
+
+def _read_exact(stream, size):
+    chunks = []
+    while size > 0:
+        data = stream.read(size)
+        if not data:
+            break
+        chunks.append(data)
+        size -= len(data)
+    return b"".join(chunks)
+
+
+class LazyAudioSource:
+    """An audio file that is decoded by ffmpeg one window at a time.
+
+    Only the duration and stream format are probed up front, so opening a
+    multi-hour recording costs almost nothing and memory use depends on the
+    window size rather than the file length.
+    """
+
+    def __init__(self, path, ffmpeg=None):
+        self.path = path
+        self.ffmpeg = ffmpeg or AudioSegment.converter
+        self.duration, self.frame_rate, self.channels = self.probe()
+
+    def __len__(self):
+        """Length in milliseconds, matching pydub.AudioSegment"""
+        return int(self.duration * 1000)
+
+    def probe(self):
+        result = subprocess.run([self.ffmpeg, "-hide_banner", "-i", self.path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        info = result.stderr.decode("utf-8", errors="replace")
+        duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", info)
+        stream = re.search(r"Stream #.*?Audio: .*?(\d+) Hz, ([^,]+)", info)
+        if not duration or not stream:
+            raise ValueError(f"Could not read audio stream information from '{self.path}'")
+        hours, minutes, seconds = duration.groups()
+        layout = stream.group(2).strip().split("(")[0]
+        channel_match = re.match(r"(\d+) channels", layout)
+        channels = int(channel_match.group(1)) if channel_match else CHANNEL_LAYOUTS.get(layout, 2)
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds), int(stream.group(1)), channels
+
+    def decode_command(self, start_ms, end_ms, sample_rate=None, channels=None):
+        return [
+            self.ffmpeg, "-v", "error",
+            "-ss", f"{start_ms / 1000:.3f}", "-t", f"{(end_ms - start_ms) / 1000:.3f}",
+            "-i", self.path, "-vn",
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ar", str(sample_rate or self.frame_rate), "-ac", str(channels or self.channels),
+            "-",
+        ]
+
+    def read(self, start_ms, end_ms, sample_rate=None, channels=None):
+        """Decode [start_ms, end_ms) into a PcmBuffer"""
+        end_ms = min(end_ms, len(self))
+        if end_ms <= start_ms:
+            return PcmBuffer(b"", sample_rate or self.frame_rate, channels or self.channels)
+        result = subprocess.run(self.decode_command(start_ms, end_ms, sample_rate, channels), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to decode '{self.path}': {result.stderr.decode('utf-8', errors='replace').strip()}")
+        return PcmBuffer(result.stdout, sample_rate or self.frame_rate, channels or self.channels)
+
+    def stream(self, start_ms, end_ms, window_ms, sample_rate=None, channels=None):
+        """Yield (window_start_ms, window_end_ms, PcmBuffer) from one ffmpeg pipe.
+
+        Raises RuntimeError, with ffmpeg's messages, if ffmpeg exits with an
+        error, so a broken decode is never taken for the end of the audio.
+        Output ending early after a clean exit is the end of the stream: the
+        probed duration of some files (VBR MP3 without a header) is only an
+        estimate.
+        """
+        end_ms = min(end_ms, len(self))
+        sample_rate = sample_rate or self.frame_rate
+        channels = channels or self.channels
+        frame_width = PcmBuffer.sample_width * channels
+        # A file rather than a pipe, so ffmpeg can never block on a full stderr
+        errors = tempfile.TemporaryFile()
+        process = subprocess.Popen(self.decode_command(start_ms, end_ms, sample_rate, channels), stdout=subprocess.PIPE, stderr=errors)
+        try:
+            received = 0
+            window_start = start_ms
+            while window_start < end_ms:
+                window_end = min(window_start + window_ms, end_ms)
+                # Count frames from the range start so rounding never drifts
+                frames = round((window_end - start_ms) * sample_rate / 1000) - round((window_start - start_ms) * sample_rate / 1000)
+                data = _read_exact(process.stdout, frames * frame_width)
+                if not data:
+                    break
+                received += len(data)
+                yield window_start, window_end, PcmBuffer(data, sample_rate, channels)
+                window_start = window_end
+            process.stdout.read()
+            returncode = process.wait()
+            if returncode != 0:
+                decoded_ms = received / frame_width * 1000 / sample_rate
+                errors.seek(0)
+                message = errors.read().decode("utf-8", errors="replace").strip() or f"exit code {returncode}"
+                raise RuntimeError(f"ffmpeg failed to decode '{self.path}' after {(start_ms + decoded_ms) / 1000:.1f}s of "
+                                   f"{start_ms / 1000:.1f}-{end_ms / 1000:.1f}s: {message}")
+        finally:
+            process.stdout.close()
+            process.kill()
+            process.wait()
+            errors.close()
+
+
+def prepared_bytes(source):
+    """Size of a source's signal at 16 kHz mono"""
+    return int(source.duration * PREPARED_SAMPLE_RATE) * PcmBuffer.sample_width
+
+
+class PreparedAudio:
+    """A source's whole signal at 16 kHz mono, decoded (and peak-normalized) once.
+
+    Reads and streams at 16 kHz mono are slices of the prepared buffer; any
+    other format is decoded from the original source. is_normalized tells
+    callers the gain was already applied over the whole file.
+    """
+
+    def __init__(self, source, pcm, is_normalized):
+        self.source = source
+        self.pcm = pcm
+        self.is_normalized = is_normalized
+        self.path = source.path
+        self.duration = source.duration
+        self.frame_rate = source.frame_rate
+        self.channels = source.channels
+
+    def __len__(self):
+        return len(self.source)
+
+    def covers(self, sample_rate, channels):
+        return sample_rate == self.pcm.sample_rate and channels == 1
+
+    def read(self, start_ms, end_ms, sample_rate=None, channels=None):
+        if not self.covers(sample_rate, channels):
+            return self.source.read(start_ms, end_ms, sample_rate, channels)
+        return self.pcm.slice_ms(start_ms, min(end_ms, len(self)))
+
+    def stream(self, start_ms, end_ms, window_ms, sample_rate=None, channels=None):
+        if not self.covers(sample_rate, channels):
+            yield from self.source.stream(start_ms, end_ms, window_ms, sample_rate, channels)
+            return
+        end_ms = min(end_ms, len(self))
+        window_start = start_ms
+        while window_start < end_ms:
+            window_end = min(window_start + window_ms, end_ms)
+            yield window_start, window_end, self.pcm.slice_ms(window_start, window_end)
+            window_start = window_end
+
+
+class StreamedAudio(PreparedAudio):
+    """A source too long for the PreparedAudioCache budget, decoded from the file on every read.
+
+    Reads at 16 kHz mono are scaled by one gain for the whole file (found by
+    a streaming pass for the peak), so they match a PreparedAudio while only
+    the audio being read is held in memory.
+    """
+
+    def __init__(self, source, gain, is_normalized):
+        super().__init__(source, None, is_normalized)
+        self.gain = gain
+
+    def covers(self, sample_rate, channels):
+        return sample_rate == PREPARED_SAMPLE_RATE and channels == 1
+
+    def read(self, start_ms, end_ms, sample_rate=None, channels=None):
+        pcm = self.source.read(start_ms, end_ms, sample_rate, channels)
+        return pcm.with_gain(self.gain) if self.covers(sample_rate, channels) else pcm
+
+    def stream(self, start_ms, end_ms, window_ms, sample_rate=None, channels=None):
+        covered = self.covers(sample_rate, channels)
+        for window_start, window_end, pcm in self.source.stream(start_ms, end_ms, window_ms, sample_rate, channels):
+            yield window_start, window_end, pcm.with_gain(self.gain) if covered else pcm
+
+
+class PreparedAudioCache:
+    """Prepared 16 kHz mono signals of recently used files, least recently used dropped first.
+
+    Entries are keyed by path, size, modification time and normalization, so
+    an edited file is prepared again. With a directory, signals are also
+    written there as raw PCM and memory-mapped, which lets the OS page them
+    in on demand and lets later runs reuse them. A file whose prepared signal
+    would not fit in the budget is not cached but read as StreamedAudio.
+    """
+
+    def __init__(self, max_mb=DEFAULT_PREPARED_MB, directory=None):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._gains = {}  # whole-file gains of streamed files, by key
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, source, normalize=True):
+        """PreparedAudio for a LazyAudioSource, decoding it only on first use"""
+        stat = os.stat(source.path)
+        key = cache_key(os.path.abspath(source.path), stat.st_size, stat.st_mtime, normalize, PREPARED_SAMPLE_RATE)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return PreparedAudio(source, self._entries[key], normalize)
+        if prepared_bytes(source) > self.max_bytes:
+            return StreamedAudio(source, self._gain(key, source) if normalize else None, normalize)
+        pcm = self._load(key)
+        if pcm is None:
+            pcm = self._store(key, self._decode(source, normalize))
+        with self._lock:
+            self._entries[key] = pcm
+            self._evict()
+        return PreparedAudio(source, pcm, normalize)
+
+    def _decode(self, source, normalize):
+        """The whole file at 16 kHz mono in one array, normalized in place"""
+        samples = np.empty(prepared_bytes(source) // PcmBuffer.sample_width + PREPARED_SAMPLE_RATE, dtype="<i2")
+        filled = peak = 0
+        for _, _, pcm in source.stream(0, len(source), PREPARE_WINDOW_MS, PREPARED_SAMPLE_RATE, 1):
+            block = np.frombuffer(pcm.data, dtype="<i2")
+            if filled + len(block) > len(samples):
+                samples = np.concatenate((samples[:filled], np.empty(len(block), dtype="<i2")))
+            samples[filled:filled + len(block)] = block
+            filled += len(block)
+            peak = max(peak, sample_peak(block))
+        samples = samples[:filled]
+        gain = normalize_gain(peak) if normalize else None
+        if gain is not None:
+            apply_gain(samples, gain, out=samples)
+        return PcmBuffer(samples, PREPARED_SAMPLE_RATE)
+
+    def _gain(self, key, source):
+        with self._lock:
+            if key in self._gains:
+                return self._gains[key]
+        peak = 0
+        for _, _, pcm in source.stream(0, len(source), PREPARE_WINDOW_MS, PREPARED_SAMPLE_RATE, 1):
+            peak = max(peak, sample_peak(np.frombuffer(pcm.data, dtype="<i2")))
+        gain = normalize_gain(peak)
+        with self._lock:
+            self._gains[key] = gain
+        return gain
+
+    def _file(self, key):
+        return os.path.join(self.directory, key + ".pcm")
+
+    def _load(self, key):
+        if not self.directory or not os.path.exists(self._file(key)):
+            return None
+        try:
+            with open(self._file(key), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(self._file(key))
+            return PcmBuffer(mapped, PREPARED_SAMPLE_RATE)
+        except (OSError, ValueError):  # ValueError: empty file
+            return None
+
+    def _store(self, key, pcm):
+        if not self.directory or not len(pcm.data):
+            return pcm
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pcm.data)
+        os.replace(temp_path, self._file(key))
+        self._prune_directory()
+        return self._load(key) or pcm
+
+    def _prune_directory(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".pcm")]
+        files.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in files)
+        for path in files[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= os.path.getsize(path)
+            try:
+                os.remove(path)  # an open mapping stays valid on POSIX
+            except OSError:
+                pass
+
+    def _evict(self):
+        # Caller holds self._lock
+        while self._entries and sum(len(pcm.data) for pcm in self._entries.values()) > self.max_bytes:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._gains.clear()
+
+
+def frame_features(samples, frame_length):
+    """Per-frame energy (dBFS) and zero-crossing rate of float32 mono samples"""
+    frame_count = len(samples) // frame_length
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+    energy = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return energy, zcr
+
+
+def _runs(mask):
+    """(start, end) frame index pairs of the True runs in a boolean array"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+class ChunkPlan:
+    """Chunk boundaries chosen by VadChunker and how much audio they skip"""
+
+    def __init__(self, chunks, total_ms):
+        self.chunks = chunks
+        self.total_ms = total_ms
+
+    @property
+    def kept_ms(self):
+        return sum(end - start for start, end in self.chunks)
+
+    @property
+    def removed_ms(self):
+        return max(0, self.total_ms - self.kept_ms)
+
+    def summary(self):
+        percent = self.removed_ms / self.total_ms * 100 if self.total_ms else 0
+        return f"Skipped {self.removed_ms / 1000:.1f}s of silence ({percent:.0f}%), {len(self.chunks)} chunks"
+
+
+class VadChunker:
+    """Energy and zero-crossing voice activity detection.
+
+    Silences longer than `min_silence` seconds are dropped, and chunks are cut
+    at the quietest frame between `min_chunk` and `max_chunk` seconds so words
+    are not split at chunk edges. A frame only counts as silence when it is
+    at least `speech_range_db` below the loud frames as well as near the
+    noise floor, so audio without clear pauses is kept whole.
+    """
+
+    analysis_rate = 8000
+    analysis_window_ms = 60000
+
+    def __init__(self, min_chunk=5, max_chunk=30, min_silence=1.0, frame_ms=30, margin_db=10, floor_db=-60, speech_range_db=30, zcr_threshold=0.25, padding=0.2):
+        self.min_chunk = min_chunk
+        self.max_chunk = max(max_chunk, min_chunk)
+        self.min_silence = min_silence
+        self.frame_ms = frame_ms
+        self.margin_db = margin_db
+        self.floor_db = floor_db
+        self.speech_range_db = speech_range_db
+        self.zcr_threshold = zcr_threshold
+        self.padding = padding
+
+    def analyze(self, source, start_ms, end_ms):
+        """Frame energy and zero-crossing rate for a range, decoded in bounded windows"""
+        frame_length = self.analysis_rate * self.frame_ms // 1000
+        energies, zcrs = [], []
+        # Window length is a whole number of frames, so frames never straddle windows
+        window_ms = self.analysis_window_ms - self.analysis_window_ms % self.frame_ms
+        for _, _, pcm in source.stream(start_ms, end_ms, window_ms, self.analysis_rate, 1):
+            energy, zcr = frame_features(pcm.to_float32(), frame_length)
+            energies.append(energy)
+            zcrs.append(zcr)
+        if not energies:
+            return np.zeros(0), np.zeros(0)
+        return np.concatenate(energies), np.concatenate(zcrs)
+
+    def speech_mask(self, energy, zcr):
+        noise_floor, speech_level = np.percentile(energy, [10, 90])
+        # On mostly-speech audio the 10th percentile is itself speech; the loud
+        # level bounds the threshold so quiet speech is never taken for silence
+        threshold = max(min(noise_floor + self.margin_db, speech_level - self.speech_range_db), self.floor_db)
+        # Quiet, noisy frames are usually unvoiced consonants rather than silence
+        speech = (energy > threshold) | ((energy > threshold - 6) & (zcr > self.zcr_threshold))
+        pad = int(round(self.padding * 1000 / self.frame_ms))
+        if pad:
+            speech = np.convolve(speech, np.ones(2 * pad + 1), mode="same") > 0
+        # Bridge pauses too short to be worth skipping
+        min_gap = int(round(self.min_silence * 1000 / self.frame_ms))
+        for gap_start, gap_end in _runs(~speech):
+            if gap_end - gap_start < min_gap and gap_start > 0 and gap_end < len(speech):
+                speech[gap_start:gap_end] = True
+        return speech
+
+    def split_region(self, region_start, region_end, energy):
+        """Cut one speech region into chunks no longer than max_chunk"""
+        min_frames = int(self.min_chunk * 1000 / self.frame_ms)
+        max_frames = max(1, int(self.max_chunk * 1000 / self.frame_ms))
+        chunks = []
+        start = region_start
+        while region_end - start > max_frames:
+            low, high = start + min_frames, start + max_frames
+            cut = low + int(np.argmin(energy[low:high])) if high > low else high
+            chunks.append((start, cut))
+            start = cut
+        chunks.append((start, region_end))
+        return chunks
+
+    def plan(self, source, start_ms, end_ms):
+        end_ms = min(end_ms, len(source))
+        energy, zcr = self.analyze(source, start_ms, end_ms)
+        if not len(energy):
+            return ChunkPlan([], end_ms - start_ms)
+        speech = self.speech_mask(energy, zcr)
+        min_frames = int(self.min_chunk * 1000 / self.frame_ms)
+        max_frames = int(self.max_chunk * 1000 / self.frame_ms)
+
+        frames = []
+        for region_start, region_end in _runs(speech):
+            # Fold short regions into the previous chunk while it stays under max_chunk
+            if frames and frames[-1][1] - frames[-1][0] < min_frames and region_end - frames[-1][0] <= max_frames:
+                frames[-1] = (frames[-1][0], region_end)
+            else:
+                frames.extend(self.split_region(region_start, region_end, energy))
+
+        chunks = []
+        for frame_start, frame_end in frames:
+            chunk_start = start_ms + int(frame_start) * self.frame_ms
+            chunk_end = min(start_ms + int(frame_end) * self.frame_ms, end_ms)
+            if chunk_end > chunk_start:
+                chunks.append((chunk_start, chunk_end))
+        return ChunkPlan(chunks, end_ms - start_ms)
+
+
+PEAK_SAMPLE_RATE = 8000
+PEAK_BLOCK = 80  # samples per finest bin: 10 ms at PEAK_SAMPLE_RATE
+
+
+class PeakPyramid:
+    """Min/max sample levels of a recording at successively halved resolutions.
+
+    Level 0 holds one (min, max) pair per 10 ms; each following level merges
+    pairs of bins. query() reads from the coarsest level that still has a bin
+    per requested column, so drawing costs the same for a minute or ten hours.
+    """
+
+    def __init__(self, mins, maxs, duration):
+        self.duration = duration
+        self.bin_seconds = PEAK_BLOCK / PEAK_SAMPLE_RATE
+        self.levels = [(mins, maxs)]
+        while len(self.levels[-1][0]) > 1:
+            low, high = self.levels[-1]
+            if len(low) % 2:
+                low, high = np.append(low, low[-1]), np.append(high, high[-1])
+            self.levels.append((low.reshape(-1, 2).min(axis=1), high.reshape(-1, 2).max(axis=1)))
+
+    @classmethod
+    def build(cls, source, on_progress=None):
+        """Stream the source once at 8 kHz mono and bin it; on_progress receives the fraction done"""
+        mins, maxs = [], []
+        carry = np.empty(0, dtype="<i2")
+        total = len(source) or 1
+        for _, window_end, pcm in source.stream(0, len(source), 60000, PEAK_SAMPLE_RATE, 1):
+            samples = np.concatenate((carry, np.frombuffer(pcm.data, dtype="<i2")))
+            usable = len(samples) // PEAK_BLOCK * PEAK_BLOCK
+            blocks = samples[:usable].reshape(-1, PEAK_BLOCK)
+            mins.append(blocks.min(axis=1))
+            maxs.append(blocks.max(axis=1))
+            carry = samples[usable:]
+            if on_progress:
+                on_progress(window_end / total)
+        if carry.size:
+            mins.append(carry.min(keepdims=True))
+            maxs.append(carry.max(keepdims=True))
+        if not mins:
+            return cls(np.zeros(1, dtype="<i2"), np.zeros(1, dtype="<i2"), source.duration)
+        return cls(np.concatenate(mins), np.concatenate(maxs), source.duration)
+
+    def query(self, start, end, columns):
+        """(mins, maxs) as float arrays in [-1, 1], one pair per column across [start, end) seconds"""
+        columns = max(1, int(columns))
+        span = max(end - start, 1e-6)
+        # At least two bins per column, so column edges fall within a bin of where they should
+        level = int(np.clip(np.floor(np.log2(span / columns / self.bin_seconds)) - 1, 0, len(self.levels) - 1))
+        low, high = self.levels[level]
+        width = self.bin_seconds * 2 ** level
+        edges = np.floor(np.linspace(start, end, columns + 1) / width).astype(np.int64)
+        first = np.clip(edges[:-1], 0, len(low) - 1)
+        stop = int(np.clip(max(edges[-1], first[-1] + 1), 1, len(low)))
+        mins = np.minimum.reduceat(low[:stop], first) / 32768.0
+        maxs = np.maximum.reduceat(high[:stop], first) / 32768.0
+        # Columns before the start or past the end of the audio stay flat
+        outside = (edges[:-1] < 0) | (edges[:-1] >= len(low))
+        mins[outside] = 0.0
+        maxs[outside] = 0.0
+        return mins, maxs
+
+    def save(self, path):
+        np.savez(path, mins=self.levels[0][0], maxs=self.levels[0][1], duration=self.duration)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["mins"], data["maxs"], float(data["duration"]))
+
+
+def load_peaks(source, directory=None, on_progress=None):
+    """PeakPyramid for a source, read from directory if built for this file before, otherwise built and saved there"""
+    path = None
+    if directory:
+        stat = os.stat(source.path)
+        path = os.path.join(directory, cache_key(os.path.abspath(source.path), stat.st_size, stat.st_mtime, PEAK_BLOCK, PEAK_SAMPLE_RATE) + ".npz")
+        try:
+            return PeakPyramid.load(path)
+        except (OSError, ValueError, KeyError):
+            pass
+    peaks = PeakPyramid.build(source, on_progress)
+    if path:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            peaks.save(path)
+        except OSError as e:
+            print(f"Could not cache waveform peaks: {e}")
+    return peaks
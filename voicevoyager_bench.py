@@ -0,0 +1,287 @@
+"""Offline benchmark for the VoiceVoyager transcription pipeline.
+
+Generates synthetic recordings, runs them through the same probe -> decode ->
+normalize -> chunk -> backend path the app uses, with online backends replaced
+by stubs of fixed latency, and prints the results as JSON:
+
+    python voicevoyager_bench.py --durations 60 600 --backends gemini whisper --output bench.json
+    python voicevoyager_bench.py --baseline bench.json   # exit 1 on a regression
+    python voicevoyager_bench.py --startup                # GUI cold start and import-time breakdown
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from pydub import AudioSegment
+
+from voicevoyager_audio import UPLOAD_CODECS, LazyAudioSource, PreparedAudioCache, set_ffmpeg_path
+from voicevoyager_engine import TranscriptionEngine, TranscriptionSettings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STARTUP_TOP_MODULES = 15  # imports listed in the --startup breakdown
+
+BACKENDS = {
+    "gemini": "Gemini",
+    "google": "Google Speech",
+    "whisper": "Whisper",
+    "pocketsphinx": "PocketSphinx (Offline)",
+}
+
+
+def write_synthetic_audio(path, duration, sample_rate, channels, block_seconds=10):
+    """Write a WAV of alternating tone bursts and near-silence, a block at a time"""
+    rng = np.random.default_rng(0)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        written = 0
+        total = int(duration * sample_rate)
+        while written < total:
+            frames = min(block_seconds * sample_rate, total - written)
+            t = (np.arange(frames) + written) / sample_rate
+            # 3 s of "speech" (a warbling tone) followed by 1 s of background noise
+            speaking = (t % 4) < 3
+            signal = np.where(speaking, 0.3 * np.sin(2 * np.pi * (220 + 80 * np.sin(2 * np.pi * 3 * t)) * t), 0.0)
+            signal += rng.normal(0, 0.002, frames)
+            samples = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+            wav.writeframes(np.repeat(samples[:, None], channels, axis=1).tobytes())
+            written += frames
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StubEngine(TranscriptionEngine):
+    """TranscriptionEngine whose backends sleep for a fixed latency, with per-stage timing"""
+
+    def __init__(self, settings, latency, audio_cache=None):
+        super().__init__(settings, audio_cache=audio_cache)
+        self.latency = latency
+        self.timings = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            self.timings[stage] += seconds
+
+    def prepare(self, source, on_status=None):
+        started = time.perf_counter()
+        source = super().prepare(source, on_status)
+        self.add_time("prepare", time.perf_counter() - started)
+        return source
+
+    def plan_chunks(self, source, *args, **kwargs):
+        started = time.perf_counter()
+        chunk_bounds, jobs = super().plan_chunks(source, *args, **kwargs)
+        self.add_time("plan", time.perf_counter() - started)
+        return chunk_bounds, self.timed_jobs(jobs)
+
+    def timed_jobs(self, jobs):
+        jobs = iter(jobs)
+        while True:
+            started = time.perf_counter()
+            try:
+                job = next(jobs)
+            except StopIteration:
+                return
+            self.add_time("decode", time.perf_counter() - started)
+            yield job
+
+    def transcribe_pcm(self, chunk, chunk_start, chunk_end):
+        if self.settings.normalize and not self.prenormalized:
+            started = time.perf_counter()
+            chunk = chunk.normalized()
+            self.add_time("normalize", time.perf_counter() - started)
+        started = time.perf_counter()
+        # Build the payload the real backend would send, so its cost is measured too
+        if self.settings.model in ("Gemini", "Whisper"):
+            self.upload_payload(chunk)
+            self.add_time("encode", time.perf_counter() - started)
+            started = time.perf_counter()
+        else:
+            chunk.to_mono().to_bytes()
+        time.sleep(self.latency)
+        self.add_time("backend", time.perf_counter() - started)
+        return f"stub transcription {chunk_start:.0f}-{chunk_end:.0f}"
+
+
+def run_scenario(scenario, ffmpeg_path):
+    """Run one scenario; called in a fresh process so peak RSS belongs to it alone"""
+    AudioSegment.converter = ffmpeg_path
+    settings = TranscriptionSettings(
+        model=BACKENDS[scenario["backend"]],
+        chunk_duration=scenario["chunk"],
+        normalize=scenario["normalize"],
+        skip_silence=scenario["skip_silence"],
+        backend_concurrency=scenario.get("concurrency"),
+        upload_encoding={BACKENDS[scenario["backend"]]: {"codec": scenario["upload_codec"], "bitrate": scenario.get("upload_bitrate")}}
+        if scenario.get("upload_codec") else None,
+    )
+    engine = StubEngine(settings, scenario["latency"], PreparedAudioCache() if scenario.get("prepared") else None)
+    started = time.perf_counter()
+    source = LazyAudioSource(scenario["path"])
+    engine.add_time("probe", time.perf_counter() - started)
+    segments = engine.transcribe(source)
+    wall = time.perf_counter() - started
+    result = {key: value for key, value in scenario.items() if key != "path"}
+    result.update({
+        "wall_seconds": wall,
+        "real_time_factor": wall / scenario["duration"],
+        "chunks": len(segments),
+        "chunks_per_second": len(segments) / wall if wall else 0.0,
+        "audio_seconds_per_second": scenario["duration"] / wall if wall else 0.0,
+        "stage_seconds": dict(engine.timings),
+        "upload": dict(engine.upload_stats) if engine.upload_stats["chunks"] else None,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    return result
+
+
+def scenario_key(result):
+    return (result["backend"], result["duration"], result["sample_rate"], result["channels"], result["chunk"], result["normalize"], result["skip_silence"], result.get("prepared", False), result.get("upload_codec"))
+
+
+def compare(results, baseline_path, tolerance):
+    """Return descriptions of scenarios whose real-time factor got worse than the baseline by more than tolerance"""
+    with open(baseline_path, "r") as f:
+        baseline = {scenario_key(result): result for result in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(scenario_key(result))
+        if previous and result["real_time_factor"] > previous["real_time_factor"] * (1 + tolerance):
+            regressions.append(f"{result['backend']} {result['duration']}s {result['sample_rate']} Hz x{result['channels']}: "
+                               f"RTF {previous['real_time_factor']:.4f} -> {result['real_time_factor']:.4f}")
+    return regressions
+
+
+def import_breakdown(importtime_output):
+    """Cumulative seconds per module imported directly by the script, from `python -X importtime` output"""
+    totals = defaultdict(float)
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # the header
+        name = parts[2].rstrip()
+        if name.startswith(" ") and not name.startswith("  "):  # nested imports are indented further
+            totals[name.strip()] += int(parts[1]) / 1e6
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def measure_startup(top=STARTUP_TOP_MODULES):
+    """Start the GUI in a fresh interpreter until its window is idle; returns the timings"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "voicevoyager.py")
+    started = time.time()
+    process = subprocess.run([sys.executable, "-X", "importtime", script, "--exit-when-ready"], capture_output=True, text=True)
+    exited = time.time()
+    ready = [line.split()[1] for line in process.stdout.splitlines() if line.startswith("ready ")]
+    if process.returncode != 0 or not ready:
+        raise RuntimeError(f"The app did not start (exit code {process.returncode}):\n{process.stderr[-2000:]}")
+    modules = import_breakdown(process.stderr)
+    return {
+        "window_ready_seconds": round(float(ready[0]) - started, 3),
+        "process_seconds": round(exited - started, 3),
+        "import_seconds": round(sum(modules.values()), 3),
+        "imports": {name: round(seconds, 3) for name, seconds in list(modules.items())[:top]},
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the VoiceVoyager transcription pipeline with stub backends.")
+    parser.add_argument("--durations", type=float, nargs="+", default=[60, 600], help="audio lengths in seconds")
+    parser.add_argument("--sample-rates", type=int, nargs="+", default=[16000, 44100], help="sample rates of the synthetic audio")
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 2], help="channel counts of the synthetic audio")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=["gemini", "pocketsphinx"], help="backends to stub")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub backend latency per chunk in seconds")
+    parser.add_argument("--chunk", type=int, default=10, help="chunk length in seconds")
+    parser.add_argument("--no-normalize", dest="normalize", action="store_false", help="skip normalization")
+    parser.add_argument("--skip-silence", action="store_true", help="use voice-activity chunking")
+    parser.add_argument("--prepared", action="store_true", help="slice chunks from the prepared 16 kHz signal as the app does")
+    parser.add_argument("--upload-codec", choices=sorted(UPLOAD_CODECS), help="encoding of gemini and whisper uploads (default: the app's default per backend)")
+    parser.add_argument("--upload-bitrate", help="bitrate for lossy upload codecs, e.g. 32k")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed real-time factor slowdown against the baseline (default: 0.1)")
+    parser.add_argument("--startup", action="store_true", help="time the GUI's start-up and break down its imports instead of benchmarking the pipeline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.startup:
+        startup = measure_startup()
+        for name, seconds in startup["imports"].items():
+            print(f"{name:>40} {seconds:7.3f}s", file=sys.stderr)
+        print(f"{'all imports':>40} {startup['import_seconds']:7.3f}s\n{'window ready':>40} {startup['window_ready_seconds']:7.3f}s", file=sys.stderr)
+        print(json.dumps({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                          "platform": platform.platform(), "startup": startup}, indent=2))
+        return 0
+    ffmpeg_path = set_ffmpeg_path()
+    workdir = tempfile.mkdtemp(prefix="voicevoyager_bench_")
+    results = []
+    try:
+        for duration in args.durations:
+            for sample_rate in args.sample_rates:
+                for channels in args.channels:
+                    path = os.path.join(workdir, f"synthetic_{duration:g}s_{sample_rate}_{channels}ch.wav")
+                    write_synthetic_audio(path, duration, sample_rate, channels)
+                    for backend in args.backends:
+                        scenario = {
+                            "path": path, "backend": backend, "duration": duration, "sample_rate": sample_rate,
+                            "channels": channels, "chunk": args.chunk, "normalize": args.normalize,
+                            "skip_silence": args.skip_silence, "prepared": args.prepared, "latency": args.latency,
+                            "upload_codec": args.upload_codec, "upload_bitrate": args.upload_bitrate,
+                        }
+                        with ProcessPoolExecutor(max_workers=1) as executor:
+                            result = executor.submit(run_scenario, scenario, ffmpeg_path).result()
+                        results.append(result)
+                        print(f"{backend:>12} {duration:>7g}s {sample_rate:>6} Hz x{channels}: RTF {result['real_time_factor']:.4f}, "
+                              f"{result['chunks_per_second']:.1f} chunks/s, peak RSS {result['peak_rss_mb'] or 0:.0f} MB", file=sys.stderr)
+                    os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".voicevoyager")
+DEFAULT_CACHE_MB = 256
+
+
+def cache_key(*parts):
+    """SHA-256 over the given parts; bytes-like parts are hashed as-is, others by their repr"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(part)
+        else:
+            digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-bounded, least-recently-used text cache stored in SQLite.
+
+    Safe to share between threads, and between processes opening the same file.
+    """
+
+    def __init__(self, path=None, max_mb=DEFAULT_CACHE_MB, table="results"):
+        self.path = path or os.path.join(CACHE_DIR, "cache.db")
+        self.max_bytes = max_mb * 1024 * 1024
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._db:
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, size INTEGER, last_used REAL)")
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._db:
+                self._db.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, key, value):
+        size = len(value.encode("utf-8"))
+        with self._lock, self._db:
+            self._db.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)", (key, value, size, time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(f"SELECT key, size FROM {self.table} ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute(f"DELETE FROM {self.table}")
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,200 @@
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pydub import AudioSegment
+
+from voicevoyager_audio import LazyAudioSource, set_ffmpeg_path
+from voicevoyager_cache import ResultCache, DEFAULT_CACHE_MB
+from voicevoyager_export import EXPORT_FORMATS, export_path, export_segments
+from voicevoyager_governor import DEFAULT_LIMITS, configure_governors
+from voicevoyager_engine import (AUDIO_EXTENSIONS, TranscriptionEngine, TranscriptionSettings, create_audio_cache, create_clients,
+                                 load_api_keys, load_preferences, write_transcription)
+from voicevoyager_whisper import WHISPER_MODEL_SIZES, DEFAULT_WHISPER_MODEL, WhisperProcessPool, default_worker_count, limit_torch_threads, model_registry
+
+MODEL_ALIASES = {
+    "gemini": "Gemini",
+    "google": "Google Speech",
+    "whisper": "Whisper",
+    "pocketsphinx": "PocketSphinx (Offline)",
+    "whisper-local": "Whisper Local (Offline)",
+}
+
+_worker_engine = None
+
+
+def find_audio_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                files.extend(os.path.join(directory, name) for name in sorted(names) if name.lower().endswith(AUDIO_EXTENSIONS))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            print(f"Skipping '{path}': not a file or directory", file=sys.stderr)
+    return files
+
+
+def file_audio_cache(preferences):
+    """Each file is read once per run, so prepared audio only pays off when memory-mapped for later runs"""
+    return create_audio_cache(preferences) if preferences.get("audio_cache_mmap") else None
+
+
+def init_worker(settings, api_keys, memory_budget_mb, ffmpeg_path, cache_mb, rate_limits, preferences, torch_threads=None):
+    """Build one engine per worker process so clients and models are reused across files"""
+    global _worker_engine
+    if torch_threads:
+        limit_torch_threads(torch_threads)
+    AudioSegment.converter = ffmpeg_path
+    configure_governors(rate_limits)
+    model_registry.set_memory_budget(memory_budget_mb)
+    gemini_model, openai_client = create_clients(api_keys["gemini_api_key"], api_keys["openai_api_key"])
+    cache = ResultCache(max_mb=cache_mb, table="transcriptions") if cache_mb else None
+    _worker_engine = TranscriptionEngine(settings, gemini_model, openai_client, cache, audio_cache=file_audio_cache(preferences))
+
+
+def worker_rate_limits(rate_limits, jobs):
+    """Split each provider's request rate between the worker processes, which cannot share a bucket"""
+    limits = {}
+    for provider, defaults in DEFAULT_LIMITS.items():
+        options = dict(defaults)
+        options.update((rate_limits or {}).get(provider, {}))
+        options["rate"] = options["rate"] / jobs
+        options["burst"] = max(1, options["burst"] // jobs)
+        limits[provider] = options
+    return limits
+
+
+def transcribe_file(path, engine=None, export_formats=()):
+    """Transcribe one file, also exporting it in export_formats; returns (output path, number of failed chunks)"""
+    engine = engine or _worker_engine
+    source = LazyAudioSource(path)
+    journal = engine.open_journal(source)
+    try:
+        segments = engine.transcribe(source, journal=journal)
+    finally:
+        journal.close()
+    output_file = write_transcription(path, engine.settings.model, segments)
+    if export_formats:
+        export_segments(segments, [(file_type, export_path(path, file_type)) for file_type in export_formats],
+                        f"Transcription of {os.path.basename(path)}", f"Model: {engine.settings.model} | Language: {engine.settings.language}")
+    if not engine.failed:
+        journal.remove()
+    return output_file, len(engine.failed)
+
+
+def report(done, total, path, result):
+    """Print the outcome of one file, given a callable returning transcribe_file's result; returns True if it needs another run"""
+    try:
+        output_file, failed_chunks = result()
+    except Exception as e:
+        print(f"[{done}/{total}] {path} failed: {e}", file=sys.stderr)
+        return True
+    if failed_chunks:
+        print(f"[{done}/{total}] {path} -> {output_file} ({failed_chunks} chunk(s) failed, run again to retry)", file=sys.stderr)
+        return True
+    print(f"[{done}/{total}] {path} -> {output_file}")
+    return False
+
+
+def run_whisper_pool(files, settings, workers, cache_mb, preferences, export_formats=()):
+    """Whisper Local: files one after another, their chunks spread over a pool of model-holding processes"""
+    cache = ResultCache(max_mb=cache_mb, table="transcriptions") if cache_mb else None
+    pool = WhisperProcessPool(settings.whisper_model, workers)
+    engine = TranscriptionEngine(settings, cache=cache, whisper_pool=pool, audio_cache=file_audio_cache(preferences))
+    failures = 0
+    try:
+        for done, path in enumerate(files, 1):
+            failures += report(done, len(files), path, lambda: transcribe_file(path, engine, export_formats))
+    finally:
+        pool.shutdown()
+    return failures
+
+
+def run_in_process(files, settings, memory_budget_mb, ffmpeg_path, cache_mb, preferences, export_formats=()):
+    """Files one after another in this process, for Whisper Local when only one model fits the memory budget"""
+    init_worker(settings, load_api_keys(), memory_budget_mb, ffmpeg_path, cache_mb, preferences.get("rate_limits"), preferences)
+    failures = 0
+    for done, path in enumerate(files, 1):
+        failures += report(done, len(files), path, lambda: transcribe_file(path, None, export_formats))
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="voicevoyager", description="Transcribe audio files without the VoiceVoyager window.")
+    parser.add_argument("paths", nargs="+", help="audio files or directories to transcribe")
+    parser.add_argument("-m", "--model", choices=sorted(MODEL_ALIASES), default="gemini", help="transcription model (default: gemini)")
+    parser.add_argument("-l", "--language", default="en-US", help="language of the audio (default: en-US)")
+    parser.add_argument("-c", "--chunk", type=int, default=10, help="chunk length in seconds, 5-300 (default: 10)")
+    parser.add_argument("--no-normalize", dest="normalize", action="store_false", help="do not normalize audio volume")
+    parser.add_argument("--skip-silence", action="store_true", help="drop long silences and cut chunks at pauses")
+    parser.add_argument("--whisper-model", choices=WHISPER_MODEL_SIZES, default=DEFAULT_WHISPER_MODEL, help="Whisper Local model size")
+    parser.add_argument("--retries", type=int, default=2, help="extra attempts for a failing chunk with an offline model before it is marked as failed; "
+                        "online requests are retried with backoff instead (default: 2)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="always call the backend instead of reusing cached chunk results")
+    parser.add_argument("--single-pass", action="store_true", help="with whisper-local, transcribe each file in one Whisper call using its own timestamps")
+    parser.add_argument("-e", "--export", nargs="+", choices=EXPORT_FORMATS, default=[], metavar="FORMAT",
+                        help=f"also write <name>_transcription.<format> files; any of {', '.join(EXPORT_FORMATS)}")
+    parser.add_argument("-j", "--jobs", type=int, help="number of files processed in parallel; with whisper-local, the number of "
+                        "Whisper worker processes (default: one per CPU, or as many Whisper workers as fit the memory budget)")
+    args = parser.parse_args(argv)
+    if not 5 <= args.chunk <= 300:
+        parser.error("--chunk must be between 5 and 300 seconds")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = find_audio_files(args.paths)
+    if not files:
+        print("No audio files found.", file=sys.stderr)
+        return 1
+
+    try:
+        ffmpeg_path = set_ffmpeg_path()
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    preferences = load_preferences()
+    settings = TranscriptionSettings(
+        model=MODEL_ALIASES[args.model],
+        language=args.language,
+        chunk_duration=args.chunk,
+        normalize=args.normalize,
+        skip_silence=args.skip_silence,
+        whisper_model=args.whisper_model,
+        backend_concurrency=preferences.get("backend_concurrency"),
+        upload_encoding=preferences.get("upload_encoding"),
+        retries=args.retries,
+        whisper_single_pass=args.single_pass,
+    )
+    memory_budget_mb = preferences.get("whisper_memory_budget_mb", model_registry.memory_budget_mb)
+    cache_mb = preferences.get("transcription_cache_mb", DEFAULT_CACHE_MB) if args.cache and preferences.get("transcription_cache", True) else 0
+
+    jobs = max(1, min(args.jobs or os.cpu_count() or 1, len(files)))
+    torch_threads = None
+    if settings.model == "Whisper Local (Offline)":
+        # Every process holds its own model, so never start more than fit in the memory budget
+        workers = args.jobs or preferences.get("whisper_workers") or default_worker_count(settings.whisper_model, memory_budget_mb)
+        if workers > 1 and not settings.whisper_single_pass:
+            return 1 if run_whisper_pool(files, settings, workers, cache_mb, preferences, args.export) else 0
+        jobs = max(1, min(workers, len(files)))
+        if jobs == 1:
+            return 1 if run_in_process(files, settings, memory_budget_mb, ffmpeg_path, cache_mb, preferences, args.export) else 0
+        torch_threads = max(1, (os.cpu_count() or 1) // jobs)
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(settings, load_api_keys(), memory_budget_mb, ffmpeg_path, cache_mb, worker_rate_limits(preferences.get("rate_limits"), jobs), preferences, torch_threads)) as executor:
+        futures = {executor.submit(transcribe_file, path, None, args.export): path for path in files}
+        for done, future in enumerate(as_completed(futures), 1):
+            failures += report(done, len(files), futures[future], future.result)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,680 @@
+import itertools
+import json
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from cryptography.fernet import Fernet
+
+from voicevoyager_audio import DEFAULT_PREPARED_MB, PREPARED_SAMPLE_RATE, UPLOAD_CODECS, PreparedAudioCache, VadChunker, encoder_available
+from voicevoyager_cache import CACHE_DIR, cache_key
+from voicevoyager_governor import GovernedModel, governor
+from voicevoyager_segments import SegmentStore
+from voicevoyager_whisper import DEFAULT_WHISPER_MODEL, SAMPLE_RATE, model_registry, transcribe_with_progress
+
+CONFIG_FILE = "voicevoyager_config.json"
+API_CONFIG_FILE = "api_config.json"
+ENCRYPTION_KEY = b'D2RU1VRyFjEQU24RSmfz8bQELCeaFfboNQUKxXKz6io='
+
+GEMINI_MODEL = "gemini-1.5-flash"
+
+ONLINE_MODELS = ["Gemini", "Google Speech", "Whisper"]
+OFFLINE_MODELS = ["PocketSphinx (Offline)", "Whisper Local (Offline)"]
+# Backends whose requests go through a ProviderGovernor, which already retries them with backoff
+GOVERNED_MODELS = ["Gemini", "Google Speech", "Whisper"]
+
+# Chunk requests kept in flight per backend. Offline models run one chunk at a
+# time since they are CPU bound in this process.
+DEFAULT_BACKEND_CONCURRENCY = {"Gemini": 4, "Google Speech": 4, "Whisper": 4}
+
+# How chunks are encoded for backends that take an audio file. Both accept
+# FLAC, Ogg Opus and MP3. MP3 at 32 kbit/s is a tenth the size of 16 kHz WAV
+# and encodes far faster than real time; Opus is smaller still at the same
+# quality but several times slower to encode.
+DEFAULT_UPLOAD_ENCODING = {"Gemini": {"codec": "mp3", "bitrate": "32k"}, "Whisper": {"codec": "mp3", "bitrate": "32k"}}
+ENCODE_ATTEMPTS = 3  # tries at compressing one chunk before it fails
+# Largest audio each backend accepts in one request
+UPLOAD_LIMIT_BYTES = {"Gemini": 20 * 1024 * 1024, "Whisper": 25 * 1024 * 1024}
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".aiff", ".flac")
+
+
+def backend_concurrency(model, overrides=None):
+    if model not in ONLINE_MODELS:
+        return 1
+    limits = dict(DEFAULT_BACKEND_CONCURRENCY)
+    limits.update(overrides or {})
+    return max(1, int(limits.get(model, 1)))
+
+
+def upload_encoding(model, overrides=None):
+    """(codec, bitrate) chunks are uploaded in for model; overrides maps model names to {"codec": ..., "bitrate": ...}"""
+    if model not in UPLOAD_LIMIT_BYTES:
+        return None, None
+    encoding = dict(DEFAULT_UPLOAD_ENCODING.get(model, {}))
+    encoding.update((overrides or {}).get(model, {}))
+    codec = encoding.get("codec", "wav")
+    if codec not in UPLOAD_CODECS:
+        raise ValueError(f"Unknown upload codec '{codec}' for {model}; use one of {', '.join(UPLOAD_CODECS)}")
+    return codec, encoding.get("bitrate") if codec in ("opus", "mp3") else None
+
+
+def dispatch_ordered(jobs, worker, concurrency=1, on_complete=None):
+    """Run worker(job) for each job with up to `concurrency` calls in flight.
+
+    Yields (index, job, result) in submission order regardless of the order in
+    which calls finish. on_complete(index, job) is called from the consuming
+    thread as soon as each call finishes, so progress can move out of order.
+    A worker exception is re-raised when its job's turn to be yielded comes.
+    """
+    jobs = iter(jobs)
+    if concurrency <= 1:
+        for index, job in enumerate(jobs):
+            result = worker(job)
+            if on_complete:
+                on_complete(index, job)
+            yield index, job, result
+        return
+
+    pending = {}
+    finished_jobs = {}
+    next_index = 0
+    submitted = 0
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            while True:
+                # Finished results waiting on an earlier slow chunk count
+                # against the window so memory stays bounded.
+                while not exhausted and len(pending) + len(finished_jobs) < concurrency * 2 and len(pending) < concurrency:
+                    try:
+                        job = next(jobs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[executor.submit(worker, job)] = (submitted, job)
+                    submitted += 1
+                if not pending and not finished_jobs:
+                    break
+                if pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index, job = pending.pop(future)
+                        finished_jobs[index] = (job, future)
+                        if on_complete:
+                            on_complete(index, job)
+                while next_index in finished_jobs:
+                    job, future = finished_jobs.pop(next_index)
+                    yield next_index, job, future.result()
+                    next_index += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def clean_text(text):
+    text = re.sub(r'\*{1,3}(.*?)\*{1,3}', r'\1', text)
+    text = re.sub(r'_{1,2}(.*?)_{1,2}', r'\1', text)
+    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
+    return text.strip()
+
+
+def output_path(audio_path, model):
+    """Path of the transcript written next to the audio file, e.g. talk_gemini.txt"""
+    return os.path.splitext(audio_path)[0] + f"_{model.lower().replace(' ', '_')}.txt"
+
+
+def write_transcription(audio_path, model, segments):
+    return segments.save(output_path(audio_path, model))
+
+
+def journal_path(audio_path, model):
+    return output_path(audio_path, model) + ".journal"
+
+
+class TranscriptionJournal:
+    """Append-only record of finished chunks, written as each result arrives.
+
+    The first line holds a fingerprint of the audio file and settings; a
+    journal left by a run with a different fingerprint is discarded. Every
+    following line is one chunk result, so a failed or killed run can pick up
+    where it stopped.
+    """
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.results = {}
+        self._lock = threading.Lock()
+        resumed = self._load()
+        self._file = open(path, "a" if resumed else "w", encoding="utf-8")
+        if not resumed:
+            self._write({"fingerprint": fingerprint})
+
+    @staticmethod
+    def bounds_key(start_ms, end_ms):
+        return round(start_ms, 3), round(end_ms, 3)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        try:
+            if not lines or json.loads(lines[0]).get("fingerprint") != self.fingerprint:
+                return False
+        except json.JSONDecodeError:
+            return False
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short when the previous run was killed
+            key = self.bounds_key(entry["start"], entry["end"])
+            if entry.get("ok"):
+                self.results[key] = entry["text"]
+            else:
+                self.results.pop(key, None)
+        return True
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def completed(self, start_ms, end_ms):
+        """Text of a chunk that finished in this or an earlier run, else None"""
+        return self.results.get(self.bounds_key(start_ms, end_ms))
+
+    def record(self, start_ms, end_ms, text, ok=True):
+        with self._lock:
+            if ok:
+                self.results[self.bounds_key(start_ms, end_ms)] = text
+            self._write({"start": start_ms, "end": end_ms, "text": text, "ok": ok})
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_preferences(path=CONFIG_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                pass
+    return {}
+
+
+def create_audio_cache(preferences):
+    """PreparedAudioCache sized by preferences; memory-mapped under the cache directory if audio_cache_mmap is set"""
+    directory = os.path.join(CACHE_DIR, "audio") if preferences.get("audio_cache_mmap") else None
+    return PreparedAudioCache(preferences.get("audio_cache_mb", DEFAULT_PREPARED_MB), directory)
+
+
+def load_api_keys(path=API_CONFIG_FILE):
+    """Decrypt the API keys saved from the API tab; environment variables take precedence"""
+    keys = {"gemini_api_key": "", "openai_api_key": ""}
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            encrypted_data = f.read()
+        try:
+            keys.update(json.loads(Fernet(ENCRYPTION_KEY).decrypt(encrypted_data).decode()))
+        except Exception:
+            pass
+    keys["gemini_api_key"] = os.environ.get("GEMINI_API_KEY", keys["gemini_api_key"])
+    keys["openai_api_key"] = os.environ.get("OPENAI_API_KEY", keys["openai_api_key"])
+    return keys
+
+
+class LazyClient:
+    """Stands in for a client that is only built, by factory(), when first used.
+
+    Importing google.generativeai and openai takes well over a second, so
+    the clients are created on the first attribute access rather than when
+    the keys are set.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+def create_clients(gemini_api_key="", openai_api_key=""):
+    """Set up the Gemini and OpenAI clients; returns (gemini_model, openai_client).
+
+    Both are LazyClients, so nothing is imported or configured until a
+    request is made. The Gemini model is wrapped so every generate_content
+    call, for transcription and analysis alike, is rate limited and retried.
+    """
+    def gemini():
+        import google.generativeai as genai
+        genai.configure(api_key=gemini_api_key or "YOUR_GEMINI_API_KEY")
+        return GovernedModel(genai.GenerativeModel(GEMINI_MODEL))
+
+    def openai():
+        from openai import OpenAI
+        # The governor retries; SDK retries underneath would multiply its attempts and hide failures from the breaker
+        return OpenAI(api_key=openai_api_key or "YOUR_OPENAI_API_KEY", max_retries=0)
+
+    return LazyClient(gemini), LazyClient(openai)
+
+
+class TranscriptionError(Exception):
+    """A chunk failed to transcribe; carries the chunk's bounds in milliseconds"""
+
+    def __init__(self, start_ms, end_ms, cause):
+        super().__init__(str(cause))
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.cause = cause
+
+
+class TranscriptionSettings:
+    def __init__(self, model="Gemini", language="en-US", chunk_duration=10, normalize=True, skip_silence=False,
+                 whisper_model=DEFAULT_WHISPER_MODEL, backend_concurrency=None, retries=2, whisper_single_pass=False, upload_encoding=None):
+        self.model = model
+        self.language = language
+        self.chunk_duration = chunk_duration
+        self.normalize = normalize
+        self.skip_silence = skip_silence
+        self.whisper_model = whisper_model
+        self.backend_concurrency = backend_concurrency or {}
+        self.retries = retries
+        self.whisper_single_pass = whisper_single_pass
+        self.upload_encoding = upload_encoding or {}
+
+    def fingerprint(self):
+        """Settings that change what a chunk transcribes to"""
+        fingerprint = {
+            "model": self.model,
+            "language": self.language,
+            "chunk_duration": self.chunk_duration,
+            "normalize": self.normalize,
+            "skip_silence": self.skip_silence,
+            "whisper_model": self.whisper_model if self.model == "Whisper Local (Offline)" else None,
+        }
+        if self.model in UPLOAD_LIMIT_BYTES:
+            fingerprint["upload_encoding"] = list(upload_encoding(self.model, self.upload_encoding))
+        return fingerprint
+
+
+class TranscriptionEngine:
+    """Chunked transcription of an audio source, independent of any UI.
+
+    Progress is reported through optional callbacks so the Tk app and the
+    command line can present it their own way:
+      on_segment(line, ok)               a finished "[start-end] text" line, in order;
+                                         ok is False for a chunk that failed every retry
+      on_progress(done, total, eta)      a chunk finished (possibly out of order)
+      on_message(text)                   informational output
+      on_status(text)                    short status for a status bar
+      on_partial(start_ms, end_ms, text) text so far of the next chunk due in on_segment,
+                                         while a streaming backend (Gemini) is answering
+
+    When a ResultCache is given, chunks whose audio and settings were seen
+    before are answered from it without calling the backend. When a
+    TranscriptionJournal is given, chunks it already holds are skipped and
+    new results are appended to it as they arrive. When a WhisperProcessPool
+    for the selected model size is given, Whisper Local chunks run on it with
+    one chunk in flight per worker. When a PreparedAudioCache is given, runs
+    that need 16 kHz mono audio slice the file's prepared signal instead of
+    decoding each chunk, and normalization is applied over the whole file.
+    """
+
+    def __init__(self, settings, gemini_model=None, openai_client=None, cache=None, whisper_pool=None, audio_cache=None):
+        self.settings = settings
+        self.gemini_model = gemini_model
+        self.openai_client = openai_client
+        self.cache = cache
+        self.whisper_pool = whisper_pool
+        self.audio_cache = audio_cache
+        self.prenormalized = False
+        self.journal = None
+        self.failed = []
+        self.on_partial = None
+        self.head_start = None
+        self.request_timings = []  # (seconds to first text, total seconds) per streamed backend request
+        self.upload_stats = {"chunks": 0, "wav_bytes": 0, "sent_bytes": 0, "encode_seconds": 0.0}
+        self.upload_fallback = False
+        self._timings_lock = threading.Lock()
+
+    def open_journal(self, source):
+        """Journal next to the audio file, resumed if an earlier run used the same file and settings"""
+        stat = os.stat(source.path)
+        fingerprint = dict(self.settings.fingerprint(), size=stat.st_size, mtime=stat.st_mtime)
+        return TranscriptionJournal(journal_path(source.path, self.settings.model), fingerprint)
+
+    def plan_chunks(self, source, start_ms, end_ms, sample_rate, channels, on_message=None, on_status=None):
+        """Return (chunk bounds, iterable of (start_ms, end_ms, PcmBuffer) jobs).
+
+        Chunks already in the journal are yielded with no audio so they are
+        never decoded again.
+        """
+        done = self.journal.completed if self.journal else (lambda start, end: None)
+        chunk_duration = self.settings.chunk_duration
+        if self.settings.skip_silence:
+            if on_status:
+                on_status("Detecting speech...")
+            plan = VadChunker(min_chunk=chunk_duration / 2, max_chunk=chunk_duration).plan(source, start_ms, end_ms)
+            if on_message:
+                on_message(plan.summary())
+            jobs = ((chunk_start, chunk_end, None if done(chunk_start, chunk_end) is not None else source.read(chunk_start, chunk_end, sample_rate, channels))
+                    for chunk_start, chunk_end in plan.chunks)
+            return plan.chunks, jobs
+        num_chunks = math.ceil((end_ms - start_ms) / 1000 / chunk_duration)
+        chunk_bounds = [(start_ms + i * chunk_duration * 1000, min(start_ms + (i + 1) * chunk_duration * 1000, end_ms)) for i in range(num_chunks)]
+        first_missing = next((i for i, (chunk_start, chunk_end) in enumerate(chunk_bounds) if done(chunk_start, chunk_end) is None), num_chunks)
+        resumed = ((chunk_start, chunk_end, None) for chunk_start, chunk_end in chunk_bounds[:first_missing])
+        if first_missing == num_chunks:
+            return chunk_bounds, resumed
+        # ffmpeg decodes the rest of the range sequentially; only the chunks in flight are held in memory
+        remaining = source.stream(chunk_bounds[first_missing][0], end_ms, chunk_duration * 1000, sample_rate, channels)
+        return chunk_bounds, itertools.chain(resumed, remaining)
+
+    def prepare(self, source, on_status=None):
+        """The source as 16 kHz mono from the audio cache, or unchanged without one"""
+        if self.audio_cache is None:
+            return source
+        if on_status:
+            on_status("Preparing audio...")
+        return self.audio_cache.get(source, self.settings.normalize)
+
+    def transcribe(self, source, start_ms=0, end_ms=None, on_segment=None, on_progress=None, on_message=None, on_status=None, journal=None, on_partial=None,
+                   segments=None):
+        """Transcribe [start_ms, end_ms) of a LazyAudioSource into a SegmentStore (segments, or a new one) and return it.
+
+        A chunk that still fails (after settings.retries extra attempts for
+        offline models; online requests are retried by their governor) is
+        recorded as an error segment (and in self.failed) without stopping the run.
+        Anything else that goes wrong, such as decoding the audio or loading a
+        Whisper model, raises TranscriptionError.
+        """
+        segments = SegmentStore() if segments is None else segments
+        self.journal = journal
+        self.failed = []
+        self.on_partial = on_partial
+        self.request_timings = []
+        self.upload_stats = {"chunks": 0, "wav_bytes": 0, "sent_bytes": 0, "encode_seconds": 0.0}
+        model = self.settings.model
+        if model == "Whisper Local (Offline)" and self.settings.whisper_single_pass:
+            try:
+                return self.transcribe_single_pass(source, start_ms, end_ms, on_segment, on_progress, on_status, segments)
+            except Exception as e:
+                raise TranscriptionError(start_ms, min(end_ms or len(source), len(source)), e) from e
+        sample_rate = channels = None  # keep the file's own format
+        end_ms = min(end_ms or len(source), len(source))
+        try:
+            if self.settings.normalize or model == "Whisper Local (Offline)":
+                # Whisper takes raw samples only as 16 kHz mono
+                sample_rate, channels = PREPARED_SAMPLE_RATE, 1
+                source = self.prepare(source, on_status)
+            self.prenormalized = getattr(source, "is_normalized", False)
+            chunk_bounds, jobs = self.plan_chunks(source, start_ms, end_ms, sample_rate, channels, on_message, on_status)
+        except Exception as e:
+            raise TranscriptionError(start_ms, end_ms, e) from e
+        num_chunks = len(chunk_bounds)
+        if journal and on_message:
+            resumed = sum(1 for chunk_start, chunk_end in chunk_bounds if journal.completed(chunk_start, chunk_end) is not None)
+            if resumed:
+                on_message(f"Resuming: {resumed} of {num_chunks} chunks already transcribed")
+        concurrency = backend_concurrency(model, self.settings.backend_concurrency)
+        if model == "Whisper Local (Offline)" and self.uses_whisper_pool():
+            concurrency = self.whisper_pool.processes
+        started = time.time()
+        completed = [0]
+
+        def on_chunk_complete(index, job):
+            completed[0] += 1
+            if on_progress:
+                elapsed = time.time() - started
+                on_progress(completed[0], num_chunks, (elapsed / completed[0]) * (num_chunks - completed[0]))
+
+        first = len(segments)
+        self.head_start = chunk_bounds[0][0] if chunk_bounds else None
+        try:
+            for i, (chunk_start, chunk_end, _), (chunk_text, ok) in dispatch_ordered(jobs, self.transcribe_chunk, concurrency, on_chunk_complete):
+                self.head_start = chunk_bounds[i + 1][0] if i + 1 < num_chunks else None
+                index = segments.append(chunk_start, chunk_end, chunk_text, ok)
+                if not ok:
+                    self.failed.append((chunk_start, chunk_end))
+                if on_segment:
+                    on_segment(segments.line(index), ok)
+        except Exception as e:
+            # Results are yielded in order, so the failed chunk is the first one not yet appended
+            done = len(segments) - first
+            chunk_start, chunk_end = chunk_bounds[done] if done < num_chunks else (start_ms, end_ms)
+            raise TranscriptionError(chunk_start, chunk_end, e) from e
+        return segments
+
+    def transcribe_single_pass(self, source, start_ms=0, end_ms=None, on_segment=None, on_progress=None, on_status=None, segments=None):
+        """Give the whole range to Whisper Local in one call and use its own segment timestamps.
+
+        Whisper's 30 s sliding window and conditioning on previous text then
+        work across the whole recording. Chunking, silence skipping and the
+        journal do not apply; the full result is cached as one entry.
+        """
+        segments = SegmentStore() if segments is None else segments
+        end_ms = min(end_ms or len(source), len(source))
+        source = self.prepare(source, on_status)
+        if on_status:
+            on_status("Decoding audio...")
+        pcm = source.read(start_ms, end_ms, SAMPLE_RATE, 1)
+        if self.settings.normalize and not getattr(source, "is_normalized", False):
+            pcm = pcm.normalized()
+
+        key = None
+        if self.cache:
+            key = cache_key("single-pass", pcm.data, self.settings.whisper_model, self.settings.language, self.settings.normalize, start_ms, end_ms)
+            cached = self.cache.get(key)
+            if cached is not None:
+                first = len(segments)
+                segments.add_text("\n".join(json.loads(cached)))
+                if on_segment:
+                    for line in segments.lines(first):
+                        on_segment(line, True)
+                return segments
+
+        model = model_registry.get(self.settings.whisper_model)
+        started = time.time()
+
+        def on_window(decoded, total):
+            if on_progress and total:
+                window, windows = math.ceil(decoded / 30), math.ceil(total / 30)
+                elapsed = time.time() - started
+                on_progress(window, windows, elapsed / decoded * (total - decoded) if decoded else 0.0)
+
+        result = transcribe_with_progress(model, pcm.to_float32(), on_window, language=self.settings.language.split("-")[0])
+        first = len(segments)
+        for segment in result["segments"]:
+            text = clean_text(segment["text"])
+            if text:
+                index = segments.append(start_ms + segment["start"] * 1000, start_ms + segment["end"] * 1000, text)
+                if on_segment:
+                    on_segment(segments.line(index), True)
+        if key:
+            self.cache.put(key, json.dumps(list(segments.lines(first))))
+        return segments
+
+    def chunk_cache_key(self, chunk, start, end):
+        settings = self.settings
+        whisper_model = settings.whisper_model if settings.model == "Whisper Local (Offline)" else None
+        return cache_key("transcription", chunk.data, chunk.sample_rate, chunk.channels, settings.model, whisper_model,
+                         settings.language, settings.normalize, start, end,
+                         *(upload_encoding(settings.model, settings.upload_encoding) if settings.model in UPLOAD_LIMIT_BYTES else ()))
+
+    def transcribe_chunk(self, job):
+        """Return (text, ok) for one chunk, retrying failed offline backend calls"""
+        chunk_start, chunk_end, chunk = job
+        if self.journal:
+            text = self.journal.completed(chunk_start, chunk_end)
+            if text is not None:
+                return text, True
+        # Retrying a governed request here would repeat all of the governor's attempts and backoff
+        attempts = 1 if self.settings.model in GOVERNED_MODELS else self.settings.retries + 1
+        for attempt in range(attempts):
+            try:
+                text = self.transcribe_pcm(chunk, chunk_start, chunk_end)
+                break
+            except Exception as e:
+                error = e
+                print(f"Chunk {chunk_start/1000:.1f}-{chunk_end/1000:.1f}s failed (attempt {attempt + 1}): {e}")
+        else:
+            if self.journal:
+                self.journal.record(chunk_start, chunk_end, str(error), ok=False)
+            return f"[Error: {error}]", False
+        if self.journal:
+            self.journal.record(chunk_start, chunk_end, text)
+        return text, True
+
+    def transcribe_pcm(self, chunk, chunk_start, chunk_end):
+        key = None
+        if self.cache:
+            key = self.chunk_cache_key(chunk, chunk_start, chunk_end)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        text = self.call_backend(chunk.normalized() if self.settings.normalize and not self.prenormalized else chunk, chunk_start, chunk_end)
+        if key:
+            self.cache.put(key, text)
+        return text
+
+    def call_backend(self, chunk, chunk_start, chunk_end):
+        model = self.settings.model
+        if model == "Gemini":
+            return clean_text(self.transcribe_with_gemini(chunk, chunk_start, chunk_end))
+        elif model == "Google Speech":
+            return clean_text(self.transcribe_with_google(chunk, chunk_start, chunk_end))
+        elif model == "Whisper":
+            return clean_text(self.transcribe_with_whisper(chunk, chunk_start, chunk_end))
+        elif model == "PocketSphinx (Offline)":
+            return clean_text(self.transcribe_with_pocketsphinx(chunk, chunk_start, chunk_end))
+        else:  # Whisper Local (Offline)
+            return clean_text(self.transcribe_with_whisper_local(chunk, chunk_start, chunk_end))
+
+    def upload_payload(self, chunk):
+        """Encode chunk for upload to the selected backend; returns (data, MIME type, file extension)"""
+        model = self.settings.model
+        codec, bitrate = upload_encoding(model, self.settings.upload_encoding)
+        started = time.perf_counter()
+        if codec != "wav" and not encoder_available(codec):
+            if not self.upload_fallback:
+                print(f"This ffmpeg has no {codec} encoder; uploading WAV instead")
+            self.upload_fallback = True
+            codec = "wav"
+        for attempt in range(ENCODE_ATTEMPTS):
+            try:
+                data = chunk.encode(codec, bitrate)
+                break
+            except Exception as e:
+                # The encoder exists, so this is a one-off failure of this ffmpeg run
+                if attempt == ENCODE_ATTEMPTS - 1:
+                    raise
+                print(f"Encoding {codec} failed (attempt {attempt + 1}): {e}")
+        encode_seconds = time.perf_counter() - started
+        wav_bytes = len(chunk.data) + 44
+        with self._timings_lock:
+            self.upload_stats["chunks"] += 1
+            self.upload_stats["wav_bytes"] += wav_bytes
+            self.upload_stats["sent_bytes"] += len(data)
+            self.upload_stats["encode_seconds"] += encode_seconds
+        limit = UPLOAD_LIMIT_BYTES.get(model)
+        if limit and len(data) > limit:
+            raise ValueError(f"{len(data) / 1024 / 1024:.1f} MB of {codec} audio is over the {limit // 1024 // 1024} MB {model} limit; use shorter chunks or a compressed upload codec")
+        _, mime_type, extension = UPLOAD_CODECS[codec]
+        return data, mime_type, extension
+
+    def upload_summary(self):
+        """One line on upload size and encoding time, or None if nothing was uploaded"""
+        with self._timings_lock:
+            stats = dict(self.upload_stats)
+        if not stats["chunks"]:
+            return None
+        codec, bitrate = upload_encoding(self.settings.model, self.settings.upload_encoding)
+        encoding = "wav" if self.upload_fallback else " ".join(filter(None, (codec, bitrate)))
+        return (f"uploaded {stats['chunks']} chunk(s) as {encoding}: {stats['sent_bytes'] / 1024 / 1024:.2f} MB instead of "
+                f"{stats['wav_bytes'] / 1024 / 1024:.2f} MB of WAV ({stats['sent_bytes'] / max(1, stats['wav_bytes']):.0%}), "
+                f"{stats['encode_seconds']:.2f}s encoding")
+
+    def transcribe_with_gemini(self, chunk, start, end):
+        prompt = f"Transcribe this audio in {self.settings.language} with speaker labels."
+        parts = []
+
+        def on_text(piece, restart):
+            if restart:
+                parts.clear()
+            parts.append(piece)
+            # Only the chunk due next can be shown without getting ahead of the ordered output
+            if self.on_partial and start == self.head_start:
+                self.on_partial(start, end, clean_text("".join(parts)))
+
+        data, mime_type, _ = self.upload_payload(chunk)
+        text, first, total = self.gemini_model.stream_content([prompt, {"mime_type": mime_type, "data": data}], on_text)
+        with self._timings_lock:
+            self.request_timings.append((first, total))
+        return text
+
+    def timing_summary(self):
+        """One line on streamed request latency, or None if nothing was streamed"""
+        with self._timings_lock:
+            timings = list(self.request_timings)
+        if not timings:
+            return None
+        firsts = sorted(first for first, _ in timings)
+        totals = sorted(total for _, total in timings)
+        return (f"{len(timings)} request(s): first text after {firsts[len(firsts) // 2]:.2f}s median, "
+                f"complete after {totals[len(totals) // 2]:.2f}s median ({totals[-1]:.2f}s slowest)")
+
+    def transcribe_with_google(self, chunk, start, end):
+        import speech_recognition as sr
+        r = sr.Recognizer()
+        try:
+            audio = sr.AudioData(chunk.to_mono().to_bytes(), chunk.sample_rate, chunk.sample_width)
+            return governor("google_speech").call(r.recognize_google, audio, language=self.settings.language)
+        except sr.UnknownValueError as e:
+            # Raised rather than returned as text so the chunk is retried and reported as failed
+            raise RuntimeError("Google Speech could not understand the audio") from e
+        except sr.RequestError as e:
+            raise RuntimeError(f"Google Speech API request failed - {e}") from e
+
+    def transcribe_with_whisper(self, chunk, start, end):
+        data, mime_type, extension = self.upload_payload(chunk)
+        response = governor("openai").call(self.openai_client.audio.transcriptions.create, model="whisper-1", file=(f"chunk.{extension}", data, mime_type), language=self.settings.language.split("-")[0])
+        return response.text
+
+    def transcribe_with_pocketsphinx(self, chunk, start, end):
+        import speech_recognition as sr
+        r = sr.Recognizer()
+        audio = sr.AudioData(chunk.to_mono().to_bytes(), chunk.sample_rate, chunk.sample_width)
+        return r.recognize_sphinx(audio, language="en-US")
+
+    def uses_whisper_pool(self):
+        return self.whisper_pool is not None and self.whisper_pool.name == self.settings.whisper_model
+
+    def transcribe_with_whisper_local(self, chunk, start, end):
+        language = self.settings.language.split("-")[0]
+        if self.uses_whisper_pool():
+            return self.whisper_pool.transcribe(chunk.to_float32(), language=language)
+        model = model_registry.get(self.settings.whisper_model)
+        result = model.transcribe(chunk.to_float32(), language=language)
+        return result["text"]
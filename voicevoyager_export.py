@@ -0,0 +1,176 @@
+import json
+import os
+
+PROGRESS_EVERY = 500  # segments between on_progress calls
+
+
+def format_timestamp(ms, separator):
+    ms = int(round(ms))
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+
+def cue_text(text):
+    # A blank line would end the cue early in SRT and WebVTT
+    return "\n".join(line for line in text.splitlines() if line.strip())
+
+
+class TextExporter:
+    """Base for formats written segment by segment to a buffered text file"""
+
+    def __init__(self, path, title="", details=""):
+        self.file = open(path, "w", encoding="utf-8", newline="\n")
+        self.count = 0
+
+    def write(self, segment):
+        raise NotImplementedError
+
+    def close(self):
+        self.file.close()
+
+
+class SrtExporter(TextExporter):
+    def write(self, segment):
+        if not segment.ok or not segment.text.strip():
+            return
+        self.count += 1
+        self.file.write(f"{self.count}\n{format_timestamp(segment.start, ',')} --> {format_timestamp(segment.end, ',')}\n{cue_text(segment.text)}\n\n")
+
+
+class VttExporter(TextExporter):
+    def __init__(self, path, title="", details=""):
+        super().__init__(path, title, details)
+        self.file.write("WEBVTT\n\n")
+
+    def write(self, segment):
+        if not segment.ok or not segment.text.strip():
+            return
+        text = cue_text(segment.text).replace("-->", "->")
+        self.file.write(f"{format_timestamp(segment.start, '.')} --> {format_timestamp(segment.end, '.')}\n{text}\n\n")
+
+
+class JsonlExporter(TextExporter):
+    def write(self, segment):
+        record = {"start": segment.start / 1000, "end": segment.end / 1000, "text": segment.text, "ok": segment.ok}
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class PdfExporter:
+    """Draws lines straight onto pages, so each page is finished and compressed as soon as it is full
+
+    reportlab, like python-docx for DocxExporter, is imported only when an
+    export in that format is made.
+    """
+
+    margin = 72
+    font = "Helvetica"
+    size = 10
+    leading = 13
+
+    def __init__(self, path, title="", details=""):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.utils import simpleSplit
+        from reportlab.pdfgen import canvas
+        self.split = simpleSplit
+        self.canvas = canvas.Canvas(path, pagesize=letter, pageCompression=1)
+        self.width, self.height = letter
+        self.y = self.height - self.margin
+        self.draw(title, "Helvetica-Bold", 18, 24)
+        self.y -= 6
+        self.draw(details, self.font, self.size, self.leading)
+        self.y -= 12
+        self.draw("Transcription:", "Helvetica-Bold", 13, 18)
+
+    def draw(self, text, font, size, leading):
+        for paragraph in text.split("\n"):
+            for line in self.split(paragraph, font, size, self.width - 2 * self.margin) or [""]:
+                if self.y - leading < self.margin:
+                    self.canvas.showPage()
+                    self.y = self.height - self.margin
+                self.y -= leading
+                self.canvas.setFont(font, size)
+                self.canvas.drawString(self.margin, self.y, line)
+
+    def write(self, segment):
+        self.draw(segment.line, self.font, self.size, self.leading)
+        self.y -= 6
+
+    def close(self):
+        self.canvas.save()
+
+
+class DocxExporter:
+    """Appends paragraphs to the document body directly.
+
+    Document.add_paragraph() searches the body for the section properties on
+    every call, which grows with the document; inserting before the element
+    found once keeps each paragraph constant time.
+    """
+
+    def __init__(self, path, title="", details=""):
+        import docx
+        from docx.text.paragraph import Paragraph
+        self.paragraph = Paragraph
+        self.path = path
+        self.document = docx.Document()
+        self.document.add_heading(title, 0)
+        self.document.add_paragraph(details)
+        self.document.add_heading("Transcription:", level=2)
+        self.body = self.document.element.body
+        self.end = self.body.sectPr
+
+    def write(self, segment):
+        paragraph = self.paragraph(self.body._new_p(), self.document._body)
+        if self.end is not None:
+            self.end.addprevious(paragraph._p)
+        else:
+            self.body.append(paragraph._p)
+        paragraph.add_run(segment.line)
+
+    def close(self):
+        self.document.save(self.path)
+
+
+EXPORTERS = {"pdf": PdfExporter, "docx": DocxExporter, "srt": SrtExporter, "vtt": VttExporter, "jsonl": JsonlExporter}
+EXPORT_FORMATS = list(EXPORTERS)
+
+
+def export_path(audio_path, file_type, directory=None):
+    """Where an export of audio_path goes, e.g. talk_transcription.srt next to the audio"""
+    base = os.path.splitext(os.path.basename(audio_path))[0] + f"_transcription.{file_type}"
+    return os.path.join(directory or os.path.dirname(os.path.abspath(audio_path)), base)
+
+
+def export_segments(segments, outputs, title="", details="", on_progress=None):
+    """Write a SegmentStore to every (file_type, path) in outputs in a single pass; returns the paths.
+
+    Segments are handed to all the exporters in turn as they are read, so
+    the formats are produced together and only the PDF and DOCX writers hold
+    more than the current segment. on_progress(done, total) is called every
+    PROGRESS_EVERY segments.
+    """
+    for file_type, _ in outputs:
+        if file_type not in EXPORTERS:
+            raise ValueError(f"Unknown export format '{file_type}'; use one of {', '.join(EXPORT_FORMATS)}")
+    exporters = []
+    try:
+        for file_type, path in outputs:
+            exporters.append(EXPORTERS[file_type](path, title, details))
+        total = len(segments)
+        for done, segment in enumerate(segments, 1):
+            for exporter in exporters:
+                exporter.write(segment)
+            if on_progress and (done % PROGRESS_EVERY == 0 or done == total):
+                on_progress(done, total)
+    except Exception:
+        for exporter in exporters:
+            try:
+                exporter.close()
+            except Exception:
+                pass
+        raise
+    for exporter in exporters:
+        exporter.close()
+    return [path for _, path in outputs]
@@ -0,0 +1,292 @@
+import random
+import socket
+import threading
+import time
+
+# Requests per second, burst size and retry policy per provider. Override any
+# of these with "rate_limits" in voicevoyager_config.json, e.g.
+# {"rate_limits": {"gemini": {"rate": 0.25, "burst": 1}}} for the free tier.
+DEFAULT_LIMITS = {
+    "gemini": {"rate": 2.0, "burst": 4},
+    "openai": {"rate": 1.0, "burst": 4},
+    "google_speech": {"rate": 2.0, "burst": 4},
+}
+DEFAULT_POLICY = {
+    "max_retries": 5,
+    "base_delay": 1.0,
+    "max_delay": 60.0,
+    "failure_threshold": 5,
+    "reset_timeout": 30.0,
+}
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {
+    # openai
+    "RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+    # google.api_core
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "TooManyRequests",
+    # speech_recognition wraps network failures in RequestError
+    "RequestError",
+}
+
+
+def status_code(error):
+    code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if callable(code):
+        try:
+            code = code()
+        except Exception:
+            return None
+    code = getattr(code, "value", code)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limited(error):
+    return status_code(error) == 429 or type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+
+def is_transient(error):
+    """Whether a failed request is worth retrying"""
+    if isinstance(error, (TimeoutError, ConnectionError, socket.timeout)):
+        return True
+    if status_code(error) in TRANSIENT_STATUS_CODES:
+        return True
+    return type(error).__name__ in TRANSIENT_ERROR_NAMES
+
+
+def retry_after(error):
+    """Seconds the provider asked us to wait, from a Retry-After header if present"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate backs off on 429s and recovers on success"""
+
+    def __init__(self, rate, burst=1):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        if not self.rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttle(self):
+        with self._lock:
+            if self.rate:
+                self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def recover(self):
+        with self._lock:
+            if self.rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """Stops calls to a backend after repeated failures, then lets one trial call through.
+
+    While open, callers wait for the cool-down instead of failing, so a
+    temporarily unavailable backend pauses the run rather than ending it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def wait(self, timeout=None):
+        """Block until a call may be made; returns seconds waited"""
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                if self.opened_at is None:
+                    return time.monotonic() - started
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining <= 0 and not self.trial_running:
+                    self.trial_running = True
+                    return time.monotonic() - started
+            if timeout is not None and time.monotonic() - started >= timeout:
+                raise CircuitOpenError("backend is unavailable")
+            time.sleep(max(0.05, min(remaining, 1.0)))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_running:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+                self.trial_running = False
+
+
+class ProviderGovernor:
+    """Rate limiting, retry with exponential backoff and full jitter, and a circuit breaker for one provider"""
+
+    def __init__(self, name, rate=None, burst=1, max_retries=5, base_delay=1.0, max_delay=60.0, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.wait_time = 0.0
+        self._lock = threading.Lock()
+
+    def call(self, function, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            waited = self.breaker.wait()
+            waited += self.bucket.acquire()
+            with self._lock:
+                self.calls += 1
+                self.wait_time += waited
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                if not is_transient(e):
+                    # The backend answered, it just rejected this request
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if is_rate_limited(e):
+                    self.bucket.throttle()
+                with self._lock:
+                    self.failures += 1
+                if attempt == self.max_retries:
+                    raise
+                delay = retry_after(e) or random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                print(f"{self.name}: {type(e).__name__} ({e}); retrying in {delay:.1f}s")
+                with self._lock:
+                    self.retries += 1
+                    self.wait_time += delay
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                self.bucket.recover()
+                return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "wait_time": self.wait_time,
+                "rate": self.bucket.rate,
+                "circuit": self.breaker.state,
+                "times_opened": self.breaker.times_opened,
+            }
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+_overrides = {}
+
+
+def configure_governors(overrides=None):
+    """Apply per-provider settings (e.g. from preferences); existing governors are rebuilt"""
+    with _governors_lock:
+        _overrides.clear()
+        _overrides.update(overrides or {})
+        _governors.clear()
+
+
+def governor(provider):
+    """The process-wide governor for a provider, shared by transcription and analysis calls"""
+    with _governors_lock:
+        if provider not in _governors:
+            options = dict(DEFAULT_POLICY)
+            options.update(DEFAULT_LIMITS.get(provider, {}))
+            options.update(_overrides.get(provider, {}))
+            _governors[provider] = ProviderGovernor(provider, **options)
+        return _governors[provider]
+
+
+class GovernedModel:
+    """Wraps a Gemini GenerativeModel so every generate_content call goes through the governor"""
+
+    def __init__(self, model, provider="gemini"):
+        self.model = model
+        self.provider = provider
+
+    def generate_content(self, *args, **kwargs):
+        return governor(self.provider).call(self.model.generate_content, *args, **kwargs)
+
+    def stream_content(self, contents, on_text=None, **kwargs):
+        """generate_content with stream=True, handing each piece of text to on_text(text, restart) as it arrives.
+
+        Returns (text, seconds to first text, total seconds) for the attempt
+        that succeeded. If an attempt fails part way and is retried, the
+        retry's first piece has restart=True so callers can drop what they
+        were shown.
+        """
+        attempts = [0]
+
+        def attempt():
+            attempts[0] += 1
+            started = time.monotonic()
+            first = None
+            parts = []
+            for chunk in self.model.generate_content(contents, stream=True, **kwargs):
+                try:
+                    piece = chunk.text
+                except ValueError:  # a chunk without text parts (e.g. only safety ratings)
+                    continue
+                if not piece:
+                    continue
+                if first is None:
+                    first = time.monotonic() - started
+                if on_text:
+                    on_text(piece, attempts[0] > 1 and not parts)
+                parts.append(piece)
+            total = time.monotonic() - started
+            return "".join(parts), total if first is None else first, total
+
+        return governor(self.provider).call(attempt)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
@@ -0,0 +1,131 @@
+import collections
+import queue
+import threading
+import time
+
+mixer = None  # pygame.mixer, imported and started by init_mixer()
+_mixer_lock = threading.Lock()
+
+BLOCK_SECONDS = 2  # audio per queued Sound; also the longest wait before sound after Play or a seek
+QUEUED_BLOCKS = 3  # blocks decoded ahead of the one playing
+
+
+def init_mixer(frequency=44100, channels=1, buffer=4096):
+    """Import pygame and start its mixer the first time audio is played"""
+    global mixer
+    with _mixer_lock:
+        if mixer is None:
+            import pygame.mixer
+            pygame.mixer.init(buffer=buffer, frequency=frequency, channels=channels)
+            mixer = pygame.mixer
+    return mixer
+
+
+class BufferedPlayer:
+    """Plays a LazyAudioSource through one reserved mixer channel, a block at a time.
+
+    A decoder thread reads short blocks from a single ffmpeg pipe, already in
+    the mixer's format, and turns them into Sounds; pump(), called from the UI
+    thread, keeps the channel's queue filled. Seeking only restarts the pipe,
+    so neither Play nor a seek waits for more than one block to decode.
+    """
+
+    def __init__(self, source, channel_id=0):
+        self.source = source
+        init_mixer()
+        self.frequency, _, self.channels = mixer.get_init()
+        if mixer.get_num_channels() <= channel_id:
+            mixer.set_num_channels(channel_id + 1)
+        mixer.set_reserved(channel_id + 1)  # keep Sound.play() elsewhere from taking our channel
+        self.channel = mixer.Channel(channel_id)
+        self.blocks = collections.deque()  # (start, end, Sound) handed to the channel, playing first
+        self.anchor = (0.0, time.monotonic())  # position at a known instant
+        self.decoded = None
+        self.stopped = threading.Event()
+        self.stopped.set()
+        self.exhausted = False
+
+    def play(self, position):
+        """Start (or restart) playback at position seconds"""
+        self.stop()
+        self.stopped = threading.Event()
+        self.decoded = queue.Queue(maxsize=QUEUED_BLOCKS)
+        self.exhausted = False
+        self.anchor = (position, time.monotonic())
+        threading.Thread(target=self._decode, args=(position, self.decoded, self.stopped), daemon=True).start()
+        # Wait for the first block here so sound starts as soon as the call returns
+        self._start_next(timeout=5)
+
+    def stop(self):
+        self.stopped.set()
+        self.channel.stop()
+        self.blocks.clear()
+
+    def _decode(self, position, decoded, stopped):
+        try:
+            for start, end, pcm in self.source.stream(position * 1000, len(self.source), BLOCK_SECONDS * 1000, self.frequency, self.channels):
+                block = (start / 1000, end / 1000, mixer.Sound(buffer=pcm.to_bytes()))
+                while not stopped.is_set():
+                    try:
+                        decoded.put(block, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stopped.is_set():
+                    return
+        except Exception as e:
+            print(f"Playback decoding failed: {e}")
+        finally:
+            while not stopped.is_set():
+                try:
+                    decoded.put(None, timeout=0.1)  # end of audio
+                    break
+                except queue.Full:
+                    pass
+
+    def _next_block(self, timeout=0):
+        if self.exhausted:
+            return None
+        try:
+            block = self.decoded.get(timeout=timeout) if timeout else self.decoded.get_nowait()
+        except queue.Empty:
+            return None
+        if block is None:
+            self.exhausted = True
+        return block
+
+    def _start_next(self, timeout=0):
+        block = self._next_block(timeout)
+        if block:
+            self.channel.play(block[2])
+            self.blocks.append(block)
+            self.anchor = (block[0], time.monotonic())
+
+    def pump(self):
+        """Hand decoded blocks to the channel; call every few tens of milliseconds"""
+        if self.stopped.is_set():
+            return
+        playing = self.channel.get_sound()
+        while self.blocks and self.blocks[0][2] is not playing:
+            self.blocks.popleft()
+        if not self.channel.get_busy():
+            # Nothing playing: the start, or the decoder fell behind
+            self.blocks.clear()
+            self._start_next()
+        elif self.channel.get_queue() is None:
+            block = self._next_block()
+            if block:
+                self.channel.queue(block[2])
+                self.blocks.append(block)
+
+    def position(self):
+        """Current position in seconds, never ahead of the audio actually handed to the mixer"""
+        anchor_position, anchor_time = self.anchor
+        position = anchor_position + (time.monotonic() - anchor_time)
+        if self.blocks:
+            position = max(self.blocks[0][0], min(position, self.blocks[0][1]))
+        return position
+
+    @property
+    def finished(self):
+        return self.exhausted and not self.channel.get_busy()
@@ -0,0 +1,142 @@
+import array
+import bisect
+import re
+
+# A segment starts at a line beginning with "[start-end]" (seconds); its text may run over several lines
+SEGMENT_START = re.compile(r"(?m)^(?=\[\d+(?:\.\d+)?-\d+(?:\.\d+)?\])")
+SEGMENT_TIMES = re.compile(r"^\[(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)\]\s?")
+
+
+def format_times(start_ms, end_ms):
+    return f"[{start_ms/1000:.1f}-{end_ms/1000:.1f}]"
+
+
+def format_segment(start_ms, end_ms, text):
+    return f"{format_times(start_ms, end_ms)} {text}"
+
+
+class Segment:
+    __slots__ = ("index", "start", "end", "text", "ok")
+
+    def __init__(self, index, start, end, text, ok=True):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+        self.ok = ok
+
+    @property
+    def line(self):
+        return format_segment(self.start, self.end, self.text)
+
+    def __repr__(self):
+        return f"Segment({self.index}, {self.line!r})"
+
+
+class SegmentStore:
+    """A transcript as timed segments, in order of start time.
+
+    Start and end times (ms) live in flat arrays and the text of every
+    segment in one UTF-8 buffer addressed by offsets, so a long transcript
+    costs a few bytes per segment beyond its text, appending never copies
+    what is already stored, and the segment playing at a given time is found
+    by binary search. Segment records are only built when asked for.
+    Reads may happen while one thread appends.
+    """
+
+    def __init__(self):
+        self.starts = array.array("d")
+        self.ends = array.array("d")
+        self.ok = array.array("b")
+        self.offsets = array.array("q", [0])  # text of segment i is buffer[offsets[i]:offsets[i + 1]]
+        self.buffer = bytearray()
+
+    def __len__(self):
+        return len(self.ends)  # appended last, so a segment counts only once it is complete
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return Segment(index, self.starts[index], self.ends[index], self.text(index), bool(self.ok[index]))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, start_ms, end_ms, text, ok=True):
+        """Add a segment after the last one; returns its index"""
+        self.buffer += text.encode("utf-8")
+        self.offsets.append(len(self.buffer))
+        self.starts.append(start_ms)
+        self.ok.append(1 if ok else 0)
+        self.ends.append(end_ms)
+        return len(self.ends) - 1
+
+    def text(self, index):
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+    def line(self, index):
+        return format_segment(self.starts[index], self.ends[index], self.text(index))
+
+    def times(self, index):
+        return format_times(self.starts[index], self.ends[index])
+
+    def lines(self, start=0, stop=None):
+        for index in range(start, len(self) if stop is None else stop):
+            yield self.line(index)
+
+    def find(self, ms):
+        """Index of the segment playing at ms, or None"""
+        index = bisect.bisect_right(self.starts, ms) - 1
+        if index >= 0 and ms < self.ends[index]:
+            return index
+        return None
+
+    def span(self, start_ms, end_ms):
+        """(first, stop) indices of the segments overlapping [start_ms, end_ms)"""
+        first = bisect.bisect_right(self.starts, start_ms) - 1
+        if first < 0 or self.ends[first] <= start_ms:
+            first += 1
+        return first, max(first, bisect.bisect_left(self.starts, end_ms))
+
+    def to_text(self):
+        """The transcript in the "[start-end] text" line format of the saved _<model>.txt files"""
+        return "\n".join(self.lines())
+
+    def add_text(self, text):
+        """Append the segments of text in the saved format; text before the first timestamp becomes an untimed segment"""
+        for piece in SEGMENT_START.split(text):
+            piece = piece.rstrip("\n")
+            if not piece.strip():
+                continue
+            match = SEGMENT_TIMES.match(piece)
+            if match:
+                start, end = float(match.group(1)) * 1000, float(match.group(2)) * 1000
+                body = piece[match.end():]
+            else:
+                start = end = self.ends[-1] if len(self) else 0.0
+                body = piece
+            self.append(start, end, body, not body.startswith("[Error"))
+        return self
+
+    @classmethod
+    def from_text(cls, text):
+        return cls().add_text(text)
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for index in range(len(self)):
+                if index:
+                    f.write("\n")
+                f.write(self.line(index))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_text(f.read())
@@ -0,0 +1,105 @@
+import queue
+
+UPDATE_INTERVAL_MS = 50  # how often posted updates reach the window
+MAX_EVENTS_PER_UPDATE = 10000
+
+
+class UIQueue:
+    """Updates posted by worker threads, applied by the Tk thread on a fixed after() cadence.
+
+    Tk widgets and variables may only be touched from the thread running the
+    main loop. Workers post instead, and every interval everything posted
+    since the last update is applied at once: adjacent inserts into the same
+    widget become one insert, only the last status text and progress value
+    are set, and calls posted with the same key back to back run only once
+    (the latest). The cost per update stays flat however fast work finishes.
+    """
+
+    def __init__(self, root, status_var=None, progress=None, interval_ms=UPDATE_INTERVAL_MS, events=None):
+        self.root = root
+        self.status_var = status_var
+        self.progress = progress
+        self.interval_ms = interval_ms
+        self.events = events if events is not None else queue.Queue()
+        self.running = False
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.root.after(self.interval_ms, self.update)
+
+    def stop(self):
+        self.running = False
+
+    def insert(self, widget, text, tags=(), see=False):
+        self.events.put(("insert", widget, text, tags, see))
+
+    def status(self, text):
+        self.events.put(("status", text))
+
+    def set_progress(self, value):
+        self.events.put(("progress", value))
+
+    def call(self, function, *args, key=None):
+        """Run function(*args) on the Tk thread; with a key, a later call with the same key posted right after replaces it"""
+        self.events.put(("call", function, args, key))
+
+    def collect(self):
+        """Drain the queue into a list of operations, merging what can be merged"""
+        operations = []
+        latest = {}  # last status text and progress value since the previous call
+
+        def flush():
+            # Keep them ahead of a later call, which may set the status itself
+            operations.extend(("set", kind, value) for kind, value in latest.items())
+            latest.clear()
+
+        for _ in range(MAX_EVENTS_PER_UPDATE):
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            previous = operations[-1] if operations else None
+            if kind in ("status", "progress"):
+                latest[kind] = event[1]
+            elif kind == "insert":
+                if previous and previous[0] == "insert" and previous[1] is event[1] and previous[3] == event[3]:
+                    operations[-1] = ("insert", event[1], previous[2] + event[2], event[3], previous[4] or event[4])
+                else:
+                    operations.append(event)
+            else:
+                flush()
+                previous = operations[-1] if operations else None
+                if event[3] is not None and previous and previous[0] == "call" and previous[3] == event[3]:
+                    operations[-1] = event
+                else:
+                    operations.append(event)
+        flush()
+        return operations
+
+    def apply(self):
+        for operation in self.collect():
+            try:
+                if operation[0] == "insert":
+                    _, widget, text, tags, see = operation
+                    widget.insert("end", text, tags)
+                    if see:
+                        widget.see("end")
+                elif operation[0] == "set":
+                    if operation[1] == "status" and self.status_var is not None:
+                        self.status_var.set(operation[2])
+                    elif operation[1] == "progress" and self.progress is not None:
+                        self.progress["value"] = operation[2]
+                else:
+                    operation[1](*operation[2])
+            except Exception as e:
+                print(f"UI update failed: {e}")
+
+    def update(self):
+        if not self.running:
+            return
+        try:
+            self.apply()
+        finally:
+            self.root.after(self.interval_ms, self.update)
@@ -0,0 +1,120 @@
+import tkinter as tk
+
+MIN_VIEW_SECONDS = 1.0
+ZOOM_STEP = 1.5
+
+
+class WaveformView(tk.Canvas):
+    """Waveform overview of a PeakPyramid with a selected range and a playback cursor.
+
+    Drag to select a range (reported through on_select(start, end)), click to
+    seek (on_seek(position)), and use the mouse wheel to zoom around the
+    pointer. Each redraw asks the pyramid for one min/max pair per pixel
+    column, so it takes the same time whatever the file length or zoom.
+    """
+
+    def __init__(self, master, on_select=None, on_seek=None, height=80, **kwargs):
+        super().__init__(master, height=height, highlightthickness=0, **kwargs)
+        self.on_select = on_select
+        self.on_seek = on_seek
+        self.peaks = None
+        self.duration = 0.0
+        self.view = (0.0, 0.0)
+        self.selection = (0.0, 0.0)
+        self.cursor = None
+        self.drag_from = None
+        self.colors = {"background": "white", "wave": "#2c3e50", "selection": "#d6eaf8", "cursor": "#e74c3c"}
+        self.bind("<Configure>", lambda event: self.redraw())
+        self.bind("<ButtonPress-1>", self.on_press)
+        self.bind("<B1-Motion>", self.on_drag)
+        self.bind("<ButtonRelease-1>", self.on_release)
+        self.bind("<MouseWheel>", lambda event: self.zoom(event.x, event.delta > 0))
+        self.bind("<Button-4>", lambda event: self.zoom(event.x, True))  # X11 wheel
+        self.bind("<Button-5>", lambda event: self.zoom(event.x, False))
+
+    def set_colors(self, **colors):
+        self.colors.update(colors)
+        self.redraw()
+
+    def set_peaks(self, peaks):
+        self.peaks = peaks
+        self.duration = peaks.duration if peaks else 0.0
+        self.view = (0.0, self.duration)
+        self.redraw()
+
+    def set_selection(self, start, end):
+        self.selection = (start, end)
+        self.redraw()
+
+    def set_cursor(self, position):
+        self.cursor = position
+        self.delete("cursor")
+        self.draw_cursor()
+
+    def time_at(self, x):
+        start, end = self.view
+        return max(0.0, min(self.duration, start + (end - start) * x / max(1, self.winfo_width())))
+
+    def x_at(self, seconds):
+        start, end = self.view
+        return (seconds - start) / max(end - start, 1e-6) * self.winfo_width()
+
+    def zoom(self, x, zoom_in):
+        if not self.peaks:
+            return
+        start, end = self.view
+        anchor = self.time_at(x)
+        span = (end - start) / ZOOM_STEP if zoom_in else (end - start) * ZOOM_STEP
+        span = max(MIN_VIEW_SECONDS, min(self.duration, span))
+        # Keep the time under the pointer in place
+        start = anchor - span * x / max(1, self.winfo_width())
+        start = max(0.0, min(self.duration - span, start))
+        self.view = (start, start + span)
+        self.redraw()
+
+    def on_press(self, event):
+        if self.peaks:
+            self.drag_from = event.x
+
+    def on_drag(self, event):
+        if self.drag_from is None:
+            return
+        first, second = sorted((self.time_at(self.drag_from), self.time_at(event.x)))
+        self.set_selection(first, second)
+
+    def on_release(self, event):
+        if self.drag_from is None:
+            return
+        moved = abs(event.x - self.drag_from) >= 3
+        self.drag_from = None
+        if moved:
+            if self.on_select:
+                self.on_select(*self.selection)
+        elif self.on_seek:
+            self.on_seek(self.time_at(event.x))
+
+    def redraw(self):
+        self.delete("all")
+        width, height = self.winfo_width(), self.winfo_height()
+        self.configure(background=self.colors["background"])
+        if not self.peaks or width <= 1:
+            return
+        start, end = self.selection
+        if end > start:
+            self.create_rectangle(self.x_at(start), 0, self.x_at(end), height, fill=self.colors["selection"], width=0)
+        mins, maxs = self.peaks.query(self.view[0], self.view[1], width)
+        middle = height / 2
+        # One zig-zag line through every column's extremes instead of thousands of items
+        points = []
+        for x, (low, high) in enumerate(zip(mins, maxs)):
+            points.extend((x, middle - high * middle, x, middle - low * middle + 1))
+        if len(points) >= 4:
+            self.create_line(points, fill=self.colors["wave"])
+        self.draw_cursor()
+
+    def draw_cursor(self):
+        if self.cursor is None or not self.peaks:
+            return
+        x = self.x_at(self.cursor)
+        if 0 <= x <= self.winfo_width():
+            self.create_line(x, 0, x, self.winfo_height(), fill=self.colors["cursor"], tags="cursor")
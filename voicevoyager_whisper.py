@@ -0,0 +1,251 @@
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import threading
+import types
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+whisper = None  # imported by load_whisper(); importing it loads PyTorch, which takes seconds
+
+WHISPER_MODEL_SIZES = ["tiny", "base", "small", "medium"]
+DEFAULT_WHISPER_MODEL = "base"
+DEFAULT_MEMORY_BUDGET_MB = 4096
+SAMPLE_RATE = 16000
+FRAMES_PER_SECOND = 100  # mel frames per second of audio, the unit of Whisper's progress bar
+
+THREADS_PER_WORKER = 4
+# Rough resident size per model, used to size the worker pool before any model is loaded
+APPROX_MODEL_MB = {"tiny": 150, "base": 300, "small": 1000, "medium": 3000}
+
+_progress_lock = threading.Lock()
+_import_lock = threading.Lock()
+
+
+def whisper_available():
+    """True if openai-whisper is installed, without importing it"""
+    return whisper is not None or importlib.util.find_spec("whisper") is not None
+
+
+def load_whisper():
+    """Import openai-whisper on first use"""
+    global whisper
+    with _import_lock:
+        if whisper is None:
+            # A plain import statement, so PyInstaller's analysis still bundles whisper
+            try:
+                import whisper as module
+            except ImportError as e:
+                raise RuntimeError("openai-whisper is not installed") from e
+            whisper = module
+    return whisper
+
+
+def model_memory_bytes(model):
+    """Approximate resident size of a loaded Whisper model (parameters and buffers)"""
+    try:
+        total = sum(p.numel() * p.element_size() for p in model.parameters())
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+        return total
+    except AttributeError:
+        return 0
+
+
+class WhisperModelRegistry:
+    """Process-wide cache of loaded Whisper models.
+
+    Each model size is loaded at most once and stays resident across chunks and
+    transcription runs. When the combined size of the loaded models exceeds the
+    memory budget, the least recently used models are dropped.
+    """
+
+    def __init__(self, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.memory_budget_mb = memory_budget_mb
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def set_memory_budget(self, memory_budget_mb):
+        with self._lock:
+            self.memory_budget_mb = memory_budget_mb
+            self._evict()
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._models
+
+    def get(self, name=DEFAULT_WHISPER_MODEL):
+        if name not in WHISPER_MODEL_SIZES:
+            raise ValueError(f"Unknown Whisper model size '{name}'")
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Load outside the registry lock so other sizes stay available, but
+        # serialize loads of the same size so the weights are read only once.
+        with load_lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name]
+            model = load_whisper().load_model(name)
+            with self._lock:
+                self._models[name] = model
+                self._sizes[name] = model_memory_bytes(model)
+                self._evict(keep=name)
+            return model
+
+    def preload(self, name=DEFAULT_WHISPER_MODEL, callback=None):
+        """Load a model on a background thread; callback receives (name, error)"""
+        def do_preload():
+            error = None
+            try:
+                self.get(name)
+            except Exception as e:
+                error = e
+            if callback:
+                callback(name, error)
+        thread = threading.Thread(target=do_preload, daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self, name):
+        with self._lock:
+            self._models.pop(name, None)
+            self._sizes.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._sizes.clear()
+
+    def memory_used(self):
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _evict(self, keep=None):
+        # Caller holds self._lock. The most recently requested model is never
+        # evicted, even if it alone exceeds the budget.
+        budget = self.memory_budget_mb * 1024 * 1024
+        while sum(self._sizes.values()) > budget and len(self._models) > 1:
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                break
+            self._models.pop(oldest)
+            size = self._sizes.pop(oldest, 0)
+            print(f"Evicted Whisper model '{oldest}' ({size / 1024 / 1024:.0f} MB)")
+
+
+def transcribe_with_progress(model, audio, on_progress=None, **options):
+    """Run model.transcribe over a whole array, calling on_progress(decoded_seconds, total_seconds) per window.
+
+    Whisper only reports progress through its tqdm bar, so the bar is swapped
+    for one that forwards updates while the call runs.
+    """
+    if on_progress is None:
+        return model.transcribe(audio, **options)
+
+    class ProgressBar:
+        def __init__(self, total=None, **kwargs):
+            self.total = total or 0
+            self.n = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def update(self, n=1):
+            self.n += n
+            on_progress(min(self.n, self.total) / FRAMES_PER_SECOND, self.total / FRAMES_PER_SECOND)
+
+    module = importlib.import_module("whisper.transcribe")
+    with _progress_lock:
+        original = module.tqdm
+        module.tqdm = types.SimpleNamespace(tqdm=ProgressBar)
+        try:
+            return model.transcribe(audio, **options)
+        finally:
+            module.tqdm = original
+
+
+def default_worker_count(name, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, threads_per_worker=THREADS_PER_WORKER):
+    """Worker processes for a model size: enough to use every core, but no more than fit in the memory budget"""
+    by_cpu = (os.cpu_count() or 1) // threads_per_worker
+    by_memory = memory_budget_mb // APPROX_MODEL_MB.get(name, 1000)
+    return max(1, min(by_cpu, by_memory))
+
+
+def limit_torch_threads(threads):
+    """Keep PyTorch in this process to `threads` threads, so several model-holding processes share the cores"""
+    try:
+        import torch
+    except ImportError:  # loading the model reports the missing dependency
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:  # already set once this process ran any parallel work
+        pass
+
+
+def _init_pool_worker(name, threads):
+    limit_torch_threads(threads)
+    model_registry.get(name)
+
+
+def _pool_transcribe(name, shm_name, samples, options):
+    block = shared_memory.SharedMemory(name=shm_name)
+    try:
+        audio = np.ndarray((samples,), dtype=np.float32, buffer=block.buf)
+        result = model_registry.get(name).transcribe(audio, **options)
+        del audio  # release the view before closing the block
+        return result["text"]
+    finally:
+        block.close()
+
+
+class WhisperProcessPool:
+    """Whisper Local in a pool of processes, each holding one loaded model.
+
+    Every worker loads the model once at start-up and limits PyTorch to
+    threads_per_worker threads, so the pool as a whole uses the cores instead
+    of one process contending for them. Audio reaches a worker through a
+    shared memory block rather than being pickled. transcribe() blocks, and is
+    meant to be called from several threads at once (one per worker).
+    """
+
+    def __init__(self, name=DEFAULT_WHISPER_MODEL, processes=None, threads_per_worker=None):
+        if not whisper_available():
+            raise RuntimeError("openai-whisper is not installed")
+        self.name = name
+        self.processes = processes or default_worker_count(name)
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.processes)
+        # Forking a process that has already run PyTorch can deadlock, so workers start fresh
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_pool_worker, initargs=(name, self.threads_per_worker))
+
+    def transcribe(self, audio, **options):
+        """Transcribe a float32 sample array and return the text"""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        block = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+        try:
+            np.ndarray(audio.shape, dtype=np.float32, buffer=block.buf)[:] = audio
+            return self._executor.submit(_pool_transcribe, self.name, block.name, len(audio), options).result()
+        finally:
+            block.close()
+            block.unlink()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+model_registry = WhisperModelRegistry()